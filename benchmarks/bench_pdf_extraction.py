@@ -0,0 +1,113 @@
+# bench_pdf_extraction.py
+
+"""
+Benchmark per-report PDF parsing with and without a shared ``PdfContext``.
+
+The old extractor opened each report twice: once to find the price table and
+again in ``extract_print_date_time`` to read the print date. This times that
+two-open flow against a single ``PdfContext`` shared by both steps over a
+sample of ``data/raw_pdfs`` and checks that both produce the same table and
+print date.
+
+Usage
+-----
+    python benchmarks/bench_pdf_extraction.py                 # 40 reports spread over the corpus
+    python benchmarks/bench_pdf_extraction.py --sample 0      # every report
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pdfplumber
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "utils"))
+from mse_pdf_context import TABLE_STRATEGIES, PdfContext, first_tables
+from mse_pdf_csv import extract_print_date_time
+
+ROOT = Path(__file__).resolve().parent.parent
+DIR_RAW_PDFS = ROOT / "data" / "raw_pdfs"
+
+
+def legacy_extract(path: Path):
+    """Table from one open, print date from a second open (the old behaviour)."""
+    table = None
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages:
+            for ts in TABLE_STRATEGIES.values():
+                try:
+                    found = [raw for raw in page.extract_tables(table_settings=ts) or []
+                             if raw and len(raw) >= 2 and max(len(r) for r in raw) >= 2]
+                except Exception:
+                    continue
+                if found:
+                    table = found[0]
+                    break
+            if table:
+                break
+    return table, extract_print_date_time(path)["date"]
+
+
+def shared_extract(path: Path):
+    """Table and print date from one ``PdfContext``."""
+    table = None
+    with PdfContext(path) as ctx:
+        for i in range(ctx.n_pages):
+            found = first_tables(ctx, i)
+            if found:
+                table = found[0]
+                break
+        return table, extract_print_date_time(ctx)["date"]
+
+
+def timed(func, path: Path):
+    t0 = time.perf_counter()
+    try:
+        out = func(path)
+    except Exception as e:
+        out = repr(e)
+    return out, time.perf_counter() - t0
+
+
+def sample_paths(pdf_dir: Path, n: int):
+    paths = sorted(pdf_dir.glob("*.pdf"))
+    if n and len(paths) > n:
+        step = len(paths) / n
+        paths = [paths[int(i * step)] for i in range(n)]
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[1])
+    parser.add_argument("--pdf-dir", type = Path, default = DIR_RAW_PDFS)
+    parser.add_argument("--sample", type = int, default = 40, help = "reports to time, 0 = all")
+    args = parser.parse_args()
+
+    paths = sample_paths(args.pdf_dir, args.sample)
+    legacy_s, shared_s, mismatches = [], [], []
+    for path in paths:
+        old, t_old = timed(legacy_extract, path)
+        new, t_new = timed(shared_extract, path)
+        legacy_s.append(t_old)
+        shared_s.append(t_new)
+        if old != new:
+            mismatches.append(path.name)
+
+    print(f"{len(paths)} reports from {args.pdf_dir}")
+    print(f"{'':<10}{'total s':>10}{'mean ms':>10}{'p50 ms':>10}{'max ms':>10}")
+    for name, times in (("two opens", legacy_s), ("shared", shared_s)):
+        print(f"{name:<10}{sum(times):>10.2f}{statistics.mean(times) * 1e3:>10.1f}"
+              f"{statistics.median(times) * 1e3:>10.1f}{max(times) * 1e3:>10.1f}")
+    ratios = [o / n for o, n in zip(legacy_s, shared_s) if n > 0]
+    print(f"per-file speedup: median {statistics.median(ratios):.2f}x, "
+          f"total {sum(legacy_s) / sum(shared_s):.2f}x")
+    if mismatches:
+        print(f"⚠️ results differ for {len(mismatches)} report(s): {', '.join(mismatches)}")
+    else:
+        print("✅ identical tables and print dates")
+
+
+if __name__ == "__main__":
+    main()
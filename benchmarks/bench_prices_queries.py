@@ -0,0 +1,122 @@
+# bench_prices_queries.py
+
+"""
+Benchmark the /prices query layer as daily_prices grows.
+
+A synthetic ``daily_prices`` table is built in a scratch schema (``mse_bench``)
+for each requested size, indexed on ``(counter_id, trade_date)``, and every
+query builder from ``mse_queries`` is timed against it. The p50/p99 latencies
+should stay flat from 27k to 10M rows because each query is an index range scan.
+
+Usage
+-----
+    python benchmarks/bench_prices_queries.py --sizes 27000 1000000 10000000
+    python benchmarks/bench_prices_queries.py --baseline   # also time the old full-table read
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from mse_queries import (build_daily_prices_query, build_latest_prices_query,
+                         build_period_prices_query, build_record_count_query)
+
+load_dotenv()
+
+SCHEMA = "mse_bench"
+N_COUNTERS = 16
+END_DATE = date(2025, 9, 19)
+
+
+def make_engine():
+    host = os.getenv("PGHOST", "").strip()
+    port = os.getenv("PGPORT", "").strip() or "5432"
+    database = os.getenv("PGDATABASE", "").strip()
+    user = os.getenv("PGUSER", "").strip()
+    password = os.getenv("PGPASSWORD", "").strip()
+    return create_engine(f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}")
+
+
+def build_table(engine, n_rows: int):
+    """(Re)create mse_bench.daily_prices with ``n_rows`` synthetic rows."""
+    n_days = max(n_rows // N_COUNTERS, 1)
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {SCHEMA}.daily_prices"))
+        conn.execute(text(f"""
+            CREATE TABLE {SCHEMA}.daily_prices AS
+            SELECT 'C' || lpad(c::text, 3, '0') AS counter_id,
+                   (DATE '{END_DATE}' - d) AS trade_date,
+                   100 + random() * 10 AS open_mwk,
+                   110 + random() * 10 AS high_mwk,
+                   90 + random() * 10 AS low_mwk,
+                   100 + random() * 10 AS close_mwk,
+                   floor(random() * 100000) AS volume
+            FROM generate_series(1, {N_COUNTERS}) AS c,
+                 generate_series(0, {n_days - 1}) AS d
+        """))
+        conn.execute(text(f"ALTER TABLE {SCHEMA}.daily_prices "
+                          "ADD PRIMARY KEY (counter_id, trade_date)"))
+        conn.execute(text(f"ANALYZE {SCHEMA}.daily_prices"))
+
+
+def time_query(conn, sql: str, params: dict, repeat: int) -> np.ndarray:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        pd.read_sql(text(sql), con=conn, params=params)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return np.array(timings)
+
+
+def run(sizes, repeat: int, baseline: bool):
+    engine = make_engine()
+    counter = "C001"
+    cases = {
+        "daily (limit 100)": build_daily_prices_query(counter, limit=100),
+        "daily (1y window)": build_daily_prices_query(counter, date(2024, 1, 1), date(2024, 12, 31), 1000),
+        "range (month)": build_period_prices_query(counter, 2024, 6),
+        "range (year)": build_period_prices_query(counter, 2024),
+        "latest": build_latest_prices_query(counter),
+        "count": build_record_count_query(counter),
+    }
+    if baseline:
+        cases["baseline full read"] = ("SELECT * FROM daily_prices", {})
+
+    results = []
+    for n_rows in sizes:
+        print(f"Building {SCHEMA}.daily_prices with {n_rows:,} rows...")
+        build_table(engine, n_rows)
+        with engine.connect() as conn:
+            conn.execute(text(f"SET search_path TO {SCHEMA}"))
+            for name, (sql, params) in cases.items():
+                if name == "baseline full read" and n_rows > 1_000_000:
+                    continue
+                time_query(conn, sql, params, 3)  # warm-up
+                t = time_query(conn, sql, params, repeat)
+                results.append({"rows": n_rows, "query": name,
+                                "p50_ms": np.percentile(t, 50), "p99_ms": np.percentile(t, 99)})
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+    report = pd.DataFrame(results).pivot(index="query", columns="rows", values=["p50_ms", "p99_ms"])
+    print(report.round(2).to_string())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[27_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--baseline", action="store_true", help="also time the old SELECT * full-table read")
+    args = parser.parse_args()
+    run(args.sizes, args.repeat, args.baseline)
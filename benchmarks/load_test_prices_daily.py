@@ -0,0 +1,124 @@
+# load_test_prices_daily.py
+
+"""
+Load test for ``GET /prices/daily``: sync (threadpool) vs async (asyncpg) access path.
+
+With ``--compare`` the script starts two single-worker uvicorn servers, one with
+``MSE_DB_ASYNC=0`` and one with ``MSE_DB_ASYNC=1``, fires the same concurrent
+load at each and prints throughput and latency percentiles side by side.
+Without it, it load-tests whatever server is running at ``--url``.
+
+Requests cycle through the tickers the server lists at ``/companies``. By
+default every request misses the response cache, so the numbers reflect the
+database path: ``--compare`` starts its servers with the cache disabled and
+requests to ``--url`` carry a unique ``_nocache`` parameter. Pass ``--cache``
+to measure cached responses instead.
+
+Usage
+-----
+    python benchmarks/load_test_prices_daily.py --compare --concurrency 200 --requests 5000
+    python benchmarks/load_test_prices_daily.py --url http://127.0.0.1:8000 --concurrency 100
+    python benchmarks/load_test_prices_daily.py --compare --cache     # cache hits after the warm-up
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def server_tickers(url: str) -> list:
+    """Tickers of the server's ``tickers`` table (via ``/companies``)."""
+    companies = httpx.get(f"{url}/companies", timeout=30).raise_for_status().json()["data"]
+    tickers = [c["ticker"] for c in companies if c.get("ticker")]
+    if not tickers:
+        raise RuntimeError(f"{url}/companies lists no tickers")
+    return tickers
+
+
+async def load(url: str, n_requests: int, concurrency: int, cache: bool = False) -> dict:
+    tickers = server_tickers(url)
+    sem = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def one(i: int):
+            nonlocal errors
+            params = {"ticker": tickers[i % len(tickers)], "start_date": "2024-01-01", "limit": 100}
+            if not cache:
+                params["_nocache"] = f"{run_id}-{i}"  # unique URL: always a cache miss
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    r = await client.get("/prices/daily", params=params)
+                    if r.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        run_id = time.time_ns()
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n_requests)))
+        elapsed = time.perf_counter() - t0
+
+    lat = np.array(latencies)
+    return {"requests": n_requests, "errors": errors, "req_per_s": n_requests / elapsed,
+            "p50_ms": np.percentile(lat, 50), "p99_ms": np.percentile(lat, 99), "max_ms": lat.max()}
+
+
+def start_server(port: int, use_async: bool, cache: bool = False) -> subprocess.Popen:
+    env = dict(os.environ, MSE_DB_ASYNC="1" if use_async else "0")
+    if not cache:
+        env["MSE_CACHE_MAX_ENTRIES"] = "0"
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "mse_api:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", "1", "--log-level", "warning"],
+        cwd=ROOT, env=env)
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"uvicorn did not start on port {port}")
+
+
+def compare(n_requests: int, concurrency: int, cache: bool = False):
+    results = {}
+    for name, port, use_async in [("sync", 8101, False), ("async", 8102, True)]:
+        proc = start_server(port, use_async, cache)
+        try:
+            url = f"http://127.0.0.1:{port}"
+            asyncio.run(load(url, min(200, n_requests), concurrency, cache))  # warm-up
+            results[name] = asyncio.run(load(url, n_requests, concurrency, cache))
+        finally:
+            proc.terminate()
+            proc.wait()
+    print(pd.DataFrame(results).round(2).to_string())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--compare", action="store_true", help="start sync and async servers and compare them")
+    parser.add_argument("--cache", action="store_true", help="let requests hit the response cache")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.requests, args.concurrency, args.cache)
+    else:
+        print(pd.Series(asyncio.run(load(args.url, args.requests, args.concurrency, args.cache))).round(2).to_string())
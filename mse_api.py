@@ -1,14 +1,31 @@
-import os
+import asyncio
 from typing import Optional, List
+from pydantic import BaseModel, Field
 import pandas as pd
-import psycopg2
-from fastapi import FastAPI, Query, Path, HTTPException
-from sqlalchemy import create_engine, text
+from fastapi import FastAPI, Query, Path, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import text
 from dotenv import load_dotenv
 from pathlib import Path
-import numpy as np
 import uvicorn
 from datetime import date
+# Settings, the shared connection pool and run_query live in mse_db
+from mse_db import (engine, async_engine, run_query, pool_metrics, warm_pool,
+                    read_frame, read_frame_async, iter_chunks, aiter_chunks, MSE_DB_ASYNC)
+from mse_queries import (encode_cursor, decode_cursor, build_daily_prices_query,
+                         build_latest_quotes_query, build_latest_snapshot_query,
+                         build_bars_query, build_bars_rollup_query, BAR_INTERVAL_PATTERN, BAR_COLUMNS,
+                         build_period_prices_query, build_period_summary_query,
+                         build_record_count_query, build_counter_stats_query, build_data_version_query,
+                         build_batch_prices_query)
+from mse_tickers import TickerRegistry, COMPANY_FIELDS
+from mse_migrations import migrate, MSE_MIGRATE_ON_STARTUP
+from mse_cache import (ResponseCache, CachedResponse, cache_key, make_etag, etag_matches,
+                       storable_headers, CACHE_MAX_AGE)
+from mse_serialize import (FastJSONResponse, frame_payload, frame_records, dumps, LAYOUT_PATTERN,
+                           negotiate_format, binary_response, FORMAT_PATTERN, pa,
+                           encode_chunks, aencode_chunks, EXPORT_FORMATS, EXPORT_PATTERN)
 load_dotenv()
 
 
@@ -18,40 +35,121 @@ app = FastAPI()
 # ==========================================================
 # RETURNING DATA FROM POSTGRESQL MSE_LAB DATABASE
 # =========================================================
+async def fetch_frame(sql: str, params: dict) -> pd.DataFrame:
+    """Run a query on the configured access path (asyncpg, or the sync pool off the event loop)."""
+    if MSE_DB_ASYNC:
+        return await read_frame_async(sql, params)
+    return await run_in_threadpool(read_frame, sql, params)
 
 # =============================================================
-# Load environment variables from .env file
+# Ticker registry (loaded once, refreshed every MSE_TICKER_TTL seconds)
 # =============================================================
-load_dotenv()
+ticker_registry = TickerRegistry(engine)
+
+@app.on_event("startup")
+def load_ticker_registry():
+    warm_pool()
+    if MSE_MIGRATE_ON_STARTUP:
+        migrate(engine)
+    ticker_registry.load()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
 
-# Get database connection details from environment variables
-PGHOST = os.getenv("PGHOST", "").strip()
-PGPORT = os.getenv("PGPORT", "").strip()
-PGPORT = int(''.join(filter(str.isdigit, PGPORT))) if PGPORT else 5432
-PGDATABASE = os.getenv("PGDATABASE", "").strip()
-PGUSER = os.getenv("PGUSER", "").strip()
-PGPASSWORD = os.getenv("PGPASSWORD", "").strip()
+def response_format(request: Request, format: Optional[str]) -> str:
+    """Negotiate json / arrow / parquet; 406 if a binary format is asked for without pyarrow."""
+    fmt = negotiate_format(request.headers.get("accept"), format)
+    if fmt != "json" and pa is None:
+        raise HTTPException(status_code = 406, detail = "Arrow/Parquet responses require pyarrow on the server")
+    return fmt
 
 # =============================================================
-# Connect to the PostgreSQL database
+# Response cache (keyed on the data version bumped by every ingest and tickers update)
 # =============================================================
-def run_query(sql: str, params: tuple = ()):
-    conn = psycopg2.connect(
-        host=PGHOST,
-        port=PGPORT,
-        dbname=PGDATABASE,
-        user=PGUSER)
-    try:
-        df = pd.read_sql(sql, conn, params=params)
-        df = df.replace({np.nan: None, np.inf: None, -np.inf: None}) # convert NaN to none
-    finally:
-        conn.close()
-    return df.to_dict(orient = "records")
+response_cache = ResponseCache()
+CACHED_PATHS = ("/companies", "/prices/daily", "/prices/range", "/prices/bars")
+
+def is_cacheable(request: Request) -> bool:
+    path = request.url.path
+    return request.method == "GET" and (path in CACHED_PATHS or path.startswith("/companies/"))
+
+async def current_data_version():
+    """Data version from the database, re-read at most every MSE_CACHE_VERSION_TTL seconds."""
+    if response_cache.version_is_stale:
+        sql, params = build_data_version_query()
+        df = await fetch_frame(sql, params)
+        version = int(df['version'].iloc[0]) if not df.empty else 0
+        if response_cache.version is not None and version != response_cache.version:
+            ticker_registry.invalidate()  #the bump may come from a tickers update
+        response_cache.set_version(version)
+    return response_cache.version
+
+@app.middleware("http")
+async def cache_responses(request: Request, call_next):
+    if not response_cache.enabled or not is_cacheable(request):
+        return await call_next(request)
+
+    fmt = negotiate_format(request.headers.get("accept"), request.query_params.get("format"))
+    key = cache_key(request.url.path, request.query_params.multi_items(), fmt, await current_data_version())
+    entry = response_cache.get(key)
+    if entry is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response  #errors are never cached
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        entry = CachedResponse(response.status_code, storable_headers(response.headers), body, make_etag(body))
+        response_cache.put(key, entry)
+
+    validators = {"etag": entry.etag, "cache-control": f"public, max-age={CACHE_MAX_AGE}", "vary": "Accept"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        response_cache.count_not_modified()
+        return Response(status_code = 304, headers = validators)
+    return Response(content = entry.body, status_code = entry.status_code, headers = {**entry.headers, **validators})
+
+async def get_counter(ticker: str) -> dict:
+    """Resolve a ticker symbol to its tickers row, or answer 404."""
+    if ticker_registry.is_stale:
+        await run_in_threadpool(ticker_registry.load)
+    counter = ticker_registry.get(ticker)
+    if counter is None:
+        raise HTTPException(status_code = 404, detail = f"Ticker '{ticker}' not found")
+    return counter
+
+# =============================================================
+# BATCH PRICE QUERIES
+# =============================================================
+MAX_BATCH = 100
+
+class PriceQuery(BaseModel):
+    ticker: str
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    limit: int = Field(100, ge = 1, le = 1000)
+
+class PriceBatch(BaseModel):
+    queries: List[PriceQuery] = Field(..., min_length = 1, max_length = MAX_BATCH)
+    layout: str = Field("records", pattern = LAYOUT_PATTERN)
 
-connect = f"postgresql+psycopg2://{PGUSER}:{PGPASSWORD}@{PGHOST}:{PGPORT}/{PGDATABASE}"
-print("Connection psql string:", connect)
+async def fetch_batch(queries: List[PriceQuery], descending: bool = True) -> pd.DataFrame:
+    """Run every query of a batch in one SQL statement; rows carry their query's ``batch_index``."""
+    ids = [(await get_counter(q.ticker))['counter_id'] for q in queries]
+    sql, params = build_batch_prices_query([(id, q.start_date, q.end_date, q.limit) for id, q in zip(ids, queries)],
+                                           descending = descending)
+    return await fetch_frame(sql, params)
+
+def split_batch(df: pd.DataFrame, n: int, layout: str) -> list:
+    """Payload of each of the ``n`` queries, in request order (empty data for queries without rows)."""
+    groups = dict(iter(df.groupby('batch_index', sort = False)))
+    empty = df.iloc[0:0]
+    return [frame_payload(groups.get(i, empty).drop(columns = 'batch_index'), layout) for i in range(n)]
+
+def batch_binary_response(df: pd.DataFrame, queries: List[PriceQuery], fmt: str) -> Response:
+    """One flat Arrow/Parquet table for a batch, with the query's ticker as first column."""
+    df.insert(0, 'ticker', [queries[i].ticker for i in df['batch_index']], allow_duplicates = False)
+    return binary_response(df.drop(columns = 'batch_index'), fmt)
 
-engine = create_engine(connect, pool_pre_ping = True)
 # =============================================================
 # ENDPOINTS (NO DATA MODEL)
 # =============================================================
@@ -65,128 +163,231 @@ def Home():
 
 # 1. GET /companies
 @app.get("/companies")
-def get_companies(sector: Optional[str] = Query(None, description = "Filter companies by sector")):
-    sql = pd.read_sql("SELECT * FROM tickers", con = engine)
-    #sql['sector'] = sql['ticker'].map(sector_map)
-    sql = sql[['ticker','name','sector','date_listed']]
-    if sector:
-        sql = sql[sql['sector'] == sector]
-    sql_dict = sql.to_dict(orient='records')
+async def get_companies(sector: Optional[str] = Query(None, description = "Filter companies by sector")):
+    if ticker_registry.is_stale:
+        await run_in_threadpool(ticker_registry.load)
+    companies = ticker_registry.by_sector(sector) if sector else ticker_registry.all()
+    sql_dict = [{k: c.get(k) for k in COMPANY_FIELDS} for c in companies]
     return {'count':len(sql_dict), 'data':sql_dict}
 
 # 2. GET /companies/{ticker}
 @app.get("/companies/{ticker}")
-def get_ticker_info(ticker:str):
-    
-    sql1 = pd.read_sql("SELECT * FROM tickers", con = engine)
-    sql1 = sql1[sql1['ticker'] == ticker]
-    id   =  sql1['counter_id'].values[0]
-    sql1 = sql1[['ticker','name','sector','date_listed']]
-    ticker_info = sql1.to_dict(orient = 'records')
-
-    sql2 = pd.read_sql(f"SELECT * FROM daily_prices", con = engine)
-    sql2 = sql2 [sql2['counter_id'] == id]
-    records = len(sql2)
-    return {'Company details':ticker_info,'Total records':records}
+async def get_ticker_info(ticker:str):
+    counter = await get_counter(ticker)
+    id = counter['counter_id']
+    ticker_info = [{k: counter.get(k) for k in COMPANY_FIELDS}]
+
+    #per-counter stats maintained on ingest; indexed COUNT/MIN/MAX if the counter is not in there yet
+    sql, params = build_counter_stats_query(id)
+    stats = await fetch_frame(sql, params)
+    if stats.empty:
+        sql, params = build_record_count_query(id)
+        stats = await fetch_frame(sql, params)
+    stats = frame_records(stats)[0]
+    return FastJSONResponse({'Company details':ticker_info,'Total records':int(stats['total_records']),
+                             'First trade date':stats['first_trade_date'],'Last trade date':stats['last_trade_date']})
 
 # 3. GET /prices/daily
 
 @app.get("/prices/daily")
-def daily_prices_ticker(
-    ticker: str = Query(..., description="Stock ticker symbol"),
+async def daily_prices_ticker(
+    request: Request,
+    ticker: List[str] = Query(..., description="Stock ticker symbol; repeat or comma-separate for several"),
     start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
-    limit: Optional[int] = Query(100, description="Maximum records to return")
+    limit: int = Query(100, ge=1, le=1000, description="Maximum records to return (per ticker, 1-1000)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    layout: str = Query("records", pattern=LAYOUT_PATTERN, description="JSON layout: records or columns"),
+    format: Optional[str] = Query(None, pattern=FORMAT_PATTERN, description="json, arrow or parquet (overrides Accept)"),
+    ):
+    """Daily rows of one or more tickers, oldest first (the first ``limit`` rows of the window, as before)."""
+    fmt = response_format(request, format)
+
+    tickers = list(dict.fromkeys(t.strip() for value in ticker for t in value.split(',') if t.strip())) or ticker
+    if len(tickers) > MAX_BATCH:
+        raise HTTPException(status_code = 400, detail = f"At most {MAX_BATCH} tickers per request")
+    if len(tickers) > 1:
+        #several tickers: one statement, rows grouped per ticker (no cursor paging)
+        if cursor:
+            raise HTTPException(status_code = 400, detail = "cursor is only supported for a single ticker")
+        queries = [PriceQuery(ticker = t, start_date = start_date, end_date = end_date, limit = limit) for t in tickers]
+        df = await fetch_batch(queries, descending = False)
+        if fmt != "json":
+            return batch_binary_response(df, queries, fmt)
+        data = dict(zip(tickers, split_batch(df, len(queries), layout)))
+        return FastJSONResponse({"count": len(tickers), "data": data})
+
+    ticker = tickers[0]
+    #fetch counter id from the ticker registry
+    id = (await get_counter(ticker))['counter_id']
+
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
+
+    #filter ticker, dates and page in the database (one extra row tells if there is a next page)
+    sql, params = build_daily_prices_query(id, start_date, end_date, limit + 1, descending = False, after = after)
+    sql3 = await fetch_frame(sql, params)
+    next_cursor = None
+    if len(sql3) > limit:
+        sql3 = sql3.iloc[:limit]
+        last = sql3.iloc[-1]
+        next_cursor = encode_cursor(last['trade_date'], last['counter_id'])
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    if fmt != "json":
+        response = binary_response(sql3, fmt, {"ticker": ticker})
+        response.headers.update(headers or {})
+        return response
+    return FastJSONResponse({"Name": ticker, "data": frame_payload(sql3, layout), "next_cursor": next_cursor},
+                            headers = headers)
+
+# Batch of ticker / date-window queries in one round-trip
+@app.post("/prices/batch")
+async def batch_prices(
+    batch: PriceBatch,
+    request: Request,
+    format: Optional[str] = Query(None, pattern = FORMAT_PATTERN, description = "json, arrow or parquet (overrides Accept)"),
     ):
-    #fetch counter name from tickers table
-    sql0 = pd.read_sql("SELECT * FROM tickers", con = engine)
-    sql0  = sql0[sql0['ticker'] == ticker]
-    id = sql0['counter_id'].values[0]
-    
-    #filter ticker using counter id
-    sql3 = pd.read_sql("SELECT * FROM daily_prices", con = engine)
-    sql3 = sql3[sql3['counter_id'] == id]
-
-    if start_date:
-        sql3 = sql3[sql3['trade_date'] >= start_date]
-    if end_date:
-        sql3 = sql3[sql3['trade_date'] <= end_date]
-
-    # Apply limit (max 1000)
-    limit = min(limit or 100, 1000)
-    sql3 = sql3.head(limit)
-    sql3 = sql3.fillna('') 
-    return {"Name": ticker, "data":sql3.to_dict(orient='records')}
+    fmt = response_format(request, format)
+    df = await fetch_batch(batch.queries)
+    if fmt != "json":
+        return batch_binary_response(df, batch.queries, fmt)
+
+    results = [{**q.model_dump(), "data": data}
+               for q, data in zip(batch.queries, split_batch(df, len(batch.queries), batch.layout))]
+    return FastJSONResponse({"count": len(results), "results": results})
 
 #Fouth end-point
 @app.get("/prices/range")
-def prices_range(
+async def prices_range(
+    request: Request,
     ticker: str = Query(..., description = "Stock ticker symbol"),
     year: int = Query(..., description = "Year"),
-    month: Optional[int] = Query(None, description = "Month of the year"),
+    month: Optional[int] = Query(None, ge = 1, le = 12, description = "Month of the year"),
+    summary_only: bool = Query(False, description = "Return only the period summary, without daily rows"),
+    layout: str = Query("records", pattern = LAYOUT_PATTERN, description = "JSON layout: records or columns"),
+    format: Optional[str] = Query(None, pattern = FORMAT_PATTERN, description = "json, arrow or parquet (overrides Accept)"),
     ):
-    #fetch counter name from counter table
-    df1 = pd.read_sql("SELECT * FROM tickers", con = engine)
-    df1 = df1[df1['ticker']==ticker]
-    id = df1['counter_id'].values[0]
-     
-    #filter ticker using counter id
-    df = pd.read_sql("SELECT * FROM daily_prices", con = engine)
-    df = df[df['counter_id'] == id]
-
-    df = df[['trade_date','open_mwk','high_mwk','low_mwk','close_mwk','volume']]
-    df.columns=['Period','open',' high','low','close','Total Volume']
+    fmt = response_format(request, format)
+    #fetch counter id from the ticker registry
+    id = (await get_counter(ticker))['counter_id']
+
+    #period summary (high, low, open, close, volume, VWAP, trading days) as one SQL aggregate
+    summary_sql, summary_params = build_period_summary_query(id, year, month)
+    if summary_only:
+        summary = await fetch_frame(summary_sql, summary_params)
+        if fmt != "json":
+            return binary_response(summary, fmt, {"ticker": ticker})
+        return FastJSONResponse({"Company": ticker, "summary": frame_records(summary)[0]})
 
+    #filter ticker and period in the database
+    sql, params = build_period_prices_query(id, year, month)
+    df, summary = await asyncio.gather(fetch_frame(sql, params), fetch_frame(summary_sql, summary_params))
+    df.columns=['Period','open',' high','low','close','Total Volume']
     df['Period'] = pd.to_datetime(df['Period'])
-    df = df[df['Period'].dt.year == year]
-    if month:
-        df = df[df['Period'].dt.month == month]
+    summary = frame_records(summary)[0]
+    if fmt != "json":
+        return binary_response(df, fmt, {"ticker": ticker, "summary": dumps(summary).decode()})
+    return FastJSONResponse({"Company": ticker, "summary": summary, "data": frame_payload(df, layout)})
+
+# Weekly / monthly / yearly OHLCV bars (precomputed on ingest)
+@app.get("/prices/bars")
+async def price_bars(
+    request: Request,
+    ticker: str = Query(..., description = "Stock ticker symbol"),
+    interval: str = Query("1M", pattern = BAR_INTERVAL_PATTERN, description = "1w (weekly), 1M (monthly) or 1y (yearly)"),
+    start_date: Optional[date] = Query(None, description = "Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description = "End date (YYYY-MM-DD)"),
+    layout: str = Query("records", pattern = LAYOUT_PATTERN, description = "JSON layout: records or columns"),
+    format: Optional[str] = Query(None, pattern = FORMAT_PATTERN, description = "json, arrow or parquet (overrides Accept)"),
+    ):
+    fmt = response_format(request, format)
+    id = (await get_counter(ticker))['counter_id']
+
+    sql, params = build_bars_query(id, interval, start_date, end_date)
+    df = await fetch_frame(sql, params)
+    if df.empty:
+        #rollups not built yet for this counter: aggregate the daily rows live (whole periods, as stored)
+        sql, params = build_bars_rollup_query(interval, id, since = start_date)
+        df = await fetch_frame(sql + " ORDER BY period_start", params)
+        if end_date:
+            df = df[df['period_start'] <= end_date]
+        df = df[BAR_COLUMNS]
+
+    if fmt != "json":
+        return binary_response(df, fmt, {"ticker": ticker, "interval": interval})
+    return FastJSONResponse({"Company": ticker, "interval": interval, "data": frame_payload(df, layout)})
+
+# Bulk export (no row cap, constant memory)
+@app.get("/prices/export")
+async def export_prices(
+    ticker: Optional[str] = Query(None, description = "Stock ticker symbol (all counters if omitted)"),
+    start_date: Optional[date] = Query(None, description = "Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description = "End date (YYYY-MM-DD)"),
+    format: str = Query("csv", pattern = EXPORT_PATTERN, description = "csv or ndjson"),
+    ):
+    id = (await get_counter(ticker))['counter_id'] if ticker else None
+
+    #rows are streamed from a server-side cursor in chunks, oldest first
+    sql, params = build_daily_prices_query(id, start_date, end_date, descending = False)
+    if MSE_DB_ASYNC:
+        body = aencode_chunks(aiter_chunks(sql, params), format)
+    else:
+        body = encode_chunks(iter_chunks(sql, params), format)
 
-    df = df.fillna('') 
-    return {"Company": ticker, "data":df.to_dict(orient='records')}
+    filename = f"mse-daily-prices-{ticker or 'all'}.{format}"
+    return StreamingResponse(body, media_type = EXPORT_FORMATS[format],
+                             headers = {"Content-Disposition": f'attachment; filename="{filename}"'})
 
 #Fith end-point
 @app.get("/prices/latest")
-def recent_prices(
-    ticker: Optional[str] = Query(None, description="Stock ticker symbol"),
+async def recent_prices(
+    ticker: Optional[str] = Query(None, description="Stock ticker symbol (all stocks if omitted)"),
     ):
-     #fetch counter name from counter table
-    sql = pd.read_sql("SELECT * FROM tickers", con=engine)
-    sql = sql[sql['ticker']==ticker]
-    id = sql['counter_id'].values[0]
-    
-    #filter ticker using counter id
-    df = pd.read_sql("SELECT * FROM daily_prices", con=engine)
-    df = df[df['counter_id'] == id]
-
-    df = df[['trade_date','open_mwk','high_mwk','low_mwk','close_mwk','volume']]
-    df.columns = ['trade_date','open',' high','low','close','Total Volume']
-
-    df['trade_date'] = pd.to_datetime(df['trade_date'])
-    df_prices = df.sort_values(by ='trade_date', ascending = False).reset_index(drop=True)
-
-    # Latest price
-    latest = df_prices.iloc[0]
-    latest_date = latest['trade_date']
-    latest_price = latest['close']
-    
-    # Previous price
-    if len(df_prices) > 1:
-        prev_price = df_prices.iloc[1]['close']
-        change = latest_price - prev_price
-        change_percentage = (change / prev_price) * 100 if prev_price != 0 else 0
-    else:
-        prev_price = None
-        change = None
-        change_percentage = None
-    return {
-        "ticker": ticker,
-        "latest_date": latest_date,
-        "latest_price": latest_price,
-        "previous_price": prev_price,
-        "change": change,
-        "change_percentage": str(round(change_percentage,3))+'%'
-    }
+    #fetch counter id from the ticker registry (None = whole market)
+    id = (await get_counter(ticker))['counter_id'] if ticker else None
+
+    #read the snapshot refreshed on ingest; compute live only if it has not been built yet
+    sql, params = build_latest_snapshot_query(id)
+    df = await fetch_frame(sql, params)
+    if df.empty:
+        sql, params = build_latest_quotes_query(id)
+        df = await fetch_frame(sql, params)
+    if ticker and df.empty:
+        raise HTTPException(status_code = 404, detail = f"No prices found for '{ticker}'")
+
+    quotes = frame_records(df[['ticker','latest_date','latest_price','previous_price','change','change_percentage']])
+    for q in quotes:
+        pct = q['change_percentage']
+        q['change_percentage'] = None if pct is None or pd.isna(pct) else f"{float(pct)}%"
+    if ticker:
+        return FastJSONResponse(quotes[0])
+    return FastJSONResponse({"count": len(quotes), "data": quotes})
+
+# =============================================================
+# ADMIN
+# =============================================================
+@app.post("/admin/tickers/invalidate")
+def invalidate_ticker_registry():
+    ticker_registry.invalidate()
+    count = ticker_registry.load()
+    response_cache.clear()
+    return {"message": "Ticker registry reloaded", "count": count}
+
+@app.get("/admin/pool")
+def connection_pool_metrics():
+    return pool_metrics()
+
+@app.get("/admin/cache")
+def response_cache_stats():
+    return response_cache.stats()
+
+@app.post("/admin/cache/clear")
+def clear_response_cache():
+    response_cache.clear()
+    return {"message": "Response cache cleared"}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,159 @@
+# mse_cache.py
+
+"""
+In-memory response cache for the read-only price endpoints.
+
+Historical prices only change when a new daily report is ingested, so a
+response is a pure function of the request and the database *data version*
+(a counter bumped by ``refresh_derived`` and by the ``tickers`` writers in
+``mse_loader``). Entries are keyed on the path, the sorted query
+parameters, the negotiated response format and that version, so an ingest
+makes every older entry unreachable at once.
+
+Every cached response carries an ``ETag``; a client that sends it back in
+``If-None-Match`` gets an empty ``304 Not Modified``.
+
+Settings (environment variables)
+--------------------------------
+MSE_CACHE_MAX_ENTRIES  maximum cached responses, 0 disables the cache (default 1024)
+MSE_CACHE_MAX_BYTES    maximum total size of cached bodies (default 64 MiB)
+MSE_CACHE_MAX_AGE      ``Cache-Control: max-age`` sent to clients, seconds (default 60)
+MSE_CACHE_VERSION_TTL  seconds between data-version checks against the database (default 5)
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+CACHE_MAX_ENTRIES = int(os.getenv("MSE_CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(os.getenv("MSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_MAX_AGE = int(os.getenv("MSE_CACHE_MAX_AGE", "60"))
+CACHE_VERSION_TTL = float(os.getenv("MSE_CACHE_VERSION_TTL", "5"))
+
+# Headers that belong to one transfer and must not be replayed from the cache
+_HOP_HEADERS = {"content-length", "transfer-encoding", "connection", "date", "server"}
+
+
+class CachedResponse(NamedTuple):
+    status_code: int
+    headers: Dict[str, str]
+    body: bytes
+    etag: str
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size = 12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an ``If-None-Match`` header value covers ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (t.strip() for t in if_none_match.split(","))
+    return etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+
+def cache_key(path: str, query_items: Iterable[Tuple[str, str]], fmt: str, version) -> str:
+    """Normalized key: parameter order does not matter, the data version does."""
+    query = "&".join(f"{k}={v}" for k, v in sorted(query_items))
+    return f"{version}|{fmt}|{path}?{query}"
+
+
+def storable_headers(headers) -> Dict[str, str]:
+    return {k: v for k, v in headers.items() if k.lower() not in _HOP_HEADERS}
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU of rendered responses, bounded by entry count and total bytes.
+
+    Parameters
+    ----------
+    max_entries : int
+        Maximum number of responses kept; ``0`` disables the cache.
+    max_bytes : int
+        Maximum total body size; least recently used entries are evicted first.
+    version_ttl : float
+        How long a data version read from the database is trusted.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES,
+                 version_ttl: float = CACHE_VERSION_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version_ttl = version_ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self._version_at: Optional[float] = None
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    # --- data version -------------------------------------------------
+    @property
+    def version_is_stale(self) -> bool:
+        return self._version_at is None or time.monotonic() - self._version_at > self.version_ttl
+
+    @property
+    def version(self):
+        return self._version
+
+    def set_version(self, version):
+        """Record the current data version; a new version drops every older entry."""
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._bytes = 0
+            self._version = version
+            self._version_at = time.monotonic()
+
+    # --- entries ------------------------------------------------------
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        size = len(entry.body)
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last = False)
+                self._bytes -= len(evicted.body)
+                self._stats["evictions"] += 1
+
+    def count_not_modified(self):
+        with self._lock:
+            self._stats["not_modified"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._version_at = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "max_entries": self.max_entries, "max_bytes": self.max_bytes,
+                    "data_version": self._version, **self._stats}
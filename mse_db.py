@@ -0,0 +1,192 @@
+# mse_db.py
+
+"""
+Database settings, the shared connection pool and query helpers.
+
+Both the SQLAlchemy ``engine`` and ``run_query`` (raw psycopg2 access) draw
+connections from the same bounded pool, so a request never pays a fresh TCP
+and authentication handshake once the pool is warm.
+
+Pool settings (environment variables)
+-------------------------------------
+PG_POOL_MIN      connections kept open in the pool (default 2)
+PG_POOL_MAX      hard cap on open connections, including overflow (default 10)
+PG_POOL_TIMEOUT  seconds to wait for a free connection before failing (default 30)
+MSE_DB_ASYNC     "1" to serve queries through an asyncpg engine instead (default 0)
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+# =============================================================
+# Load environment variables from .env file
+# =============================================================
+load_dotenv()
+
+# Get database connection details from environment variables
+PGHOST = os.getenv("PGHOST", "").strip()
+PGPORT = os.getenv("PGPORT", "").strip()
+PGPORT = int(''.join(filter(str.isdigit, PGPORT))) if PGPORT else 5432
+PGDATABASE = os.getenv("PGDATABASE", "").strip()
+PGUSER = os.getenv("PGUSER", "").strip()
+PGPASSWORD = os.getenv("PGPASSWORD", "").strip()
+
+PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", "2"))
+PG_POOL_MAX = max(int(os.getenv("PG_POOL_MAX", "10")), PG_POOL_MIN)
+PG_POOL_TIMEOUT = float(os.getenv("PG_POOL_TIMEOUT", "30"))
+
+MSE_DB_ASYNC = os.getenv("MSE_DB_ASYNC", "0").strip().lower() in ("1", "true", "yes")
+
+# =============================================================
+# Connect to the PostgreSQL database
+# =============================================================
+connect = f"postgresql+psycopg2://{PGUSER}:{PGPASSWORD}@{PGHOST}:{PGPORT}/{PGDATABASE}"
+
+engine = create_engine(
+    connect,
+    pool_pre_ping = True,
+    pool_size = PG_POOL_MIN,
+    max_overflow = PG_POOL_MAX - PG_POOL_MIN,
+    pool_timeout = PG_POOL_TIMEOUT,
+)
+print("Connection psql string:", engine.url.render_as_string(hide_password = True))
+
+# Optional async engine (asyncpg driver) with the same pool bounds
+async_engine = None
+if MSE_DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_engine = create_async_engine(
+        engine.url.set(drivername = "postgresql+asyncpg"),
+        pool_pre_ping = True,
+        pool_size = PG_POOL_MIN,
+        max_overflow = PG_POOL_MAX - PG_POOL_MIN,
+        pool_timeout = PG_POOL_TIMEOUT,
+    )
+
+# =============================================================
+# Pool metrics
+# =============================================================
+_metrics_lock = threading.Lock()
+_metrics = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidated": 0,
+            "checkout_timeouts": 0, "checkout_wait_ms_total": 0.0}
+
+
+def _bump(key: str, amount=1):
+    with _metrics_lock:
+        _metrics[key] += amount
+
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_conn, record):
+    _bump("connects")
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_conn, record, proxy):
+    _bump("checkouts")
+
+
+@event.listens_for(engine, "checkin")
+def _on_checkin(dbapi_conn, record):
+    _bump("checkins")
+
+
+@event.listens_for(engine, "invalidate")
+def _on_invalidate(dbapi_conn, record, exc):
+    _bump("invalidated")
+
+
+def pool_metrics() -> dict:
+    """Current pool occupancy plus lifetime counters."""
+    pool = engine.pool
+    with _metrics_lock:
+        counters = dict(_metrics)
+    metrics = {
+        "min_size": PG_POOL_MIN,
+        "max_size": PG_POOL_MAX,
+        "timeout_s": PG_POOL_TIMEOUT,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        **counters,
+    }
+    if async_engine is not None:
+        apool = async_engine.pool
+        metrics["async"] = {"size": apool.size(), "checked_in": apool.checkedin(),
+                            "checked_out": apool.checkedout(), "overflow": apool.overflow()}
+    return metrics
+
+
+def warm_pool():
+    """Open PG_POOL_MIN connections up front so the first requests skip the handshake."""
+    conns = [engine.raw_connection() for _ in range(PG_POOL_MIN)]
+    for conn in conns:
+        conn.close()
+
+
+def raw_connection():
+    """Check a psycopg2 connection out of the shared pool (``close()`` returns it)."""
+    t0 = time.perf_counter()
+    try:
+        conn = engine.raw_connection()
+    except PoolTimeoutError:
+        _bump("checkout_timeouts")
+        raise
+    _bump("checkout_wait_ms_total", (time.perf_counter() - t0) * 1000)
+    return conn
+
+
+def run_query(sql: str, params: tuple = ()):
+    conn = raw_connection()
+    try:
+        df = pd.read_sql(sql, conn, params=params)
+        df = df.replace({np.nan: None, np.inf: None, -np.inf: None}) # convert NaN to none
+    finally:
+        conn.close()  # back to the pool
+    return df.to_dict(orient = "records")
+
+
+def read_frame(sql: str, params: dict = None) -> pd.DataFrame:
+    """Run a ``:name``-parameterized query on the pooled engine and return a DataFrame."""
+    return pd.read_sql(text(sql), con = engine, params = params or {})
+
+
+async def read_frame_async(sql: str, params: dict = None) -> pd.DataFrame:
+    """Async counterpart of ``read_frame`` on the asyncpg engine (requires MSE_DB_ASYNC)."""
+    async with async_engine.connect() as conn:
+        result = await conn.execute(text(sql), params or {})
+        rows = result.fetchall()
+        return pd.DataFrame.from_records(rows, columns = list(result.keys()), coerce_float = True)
+
+
+def iter_chunks(sql: str, params: dict = None, chunk_size: int = 5000):
+    """
+    Stream a query through a server-side cursor.
+
+    Yields the column names first, then lists of at most ``chunk_size`` rows,
+    so memory use is bounded by the chunk size rather than the result size.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results = True, max_row_buffer = chunk_size) \
+                     .execute(text(sql), params or {})
+        yield list(result.keys())
+        for rows in result.partitions(chunk_size):
+            yield rows
+
+
+async def aiter_chunks(sql: str, params: dict = None, chunk_size: int = 5000):
+    """Async counterpart of ``iter_chunks`` on the asyncpg engine (requires MSE_DB_ASYNC)."""
+    async with async_engine.connect() as conn:
+        result = await conn.stream(text(sql), params or {})
+        yield list(result.keys())
+        async for rows in result.partitions(chunk_size):
+            yield rows
@@ -0,0 +1,120 @@
+# mse_derived.py
+
+"""
+Derived tables maintained from ``daily_prices`` by the ingest pipeline.
+
+The API reads these small tables instead of recomputing from the full price
+history on every request. They only change when a new daily report is
+loaded, so the loader calls ``refresh_derived`` once after each load.
+The tables themselves are created by ``mse_migrations``.
+
+latest_quotes  latest and previous close per counter (``/prices/latest``)
+counter_stats  record count and first / last trade date per counter (``/companies/{ticker}``)
+price_bars     weekly / monthly / yearly OHLCV bars per counter (``/prices/bars``)
+data_version   single counter bumped on every refresh (response cache key, see mse_cache)
+
+Usage
+-----
+    python mse_derived.py          # refresh everything after a manual load
+"""
+
+import logging
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import text
+
+from mse_queries import BAR_INTERVALS, build_bars_rollup_query
+
+logger = logging.getLogger(__name__)
+
+# ===============================================
+# REFRESH
+# ===============================================
+def refresh_latest_quotes(conn) -> int:
+    """
+    Rebuild the latest/previous close snapshot for every counter.
+
+    Runs inside the caller's transaction, so readers keep seeing the old
+    snapshot until the load commits. Returns the number of counters.
+    """
+    conn.execute(text("DELETE FROM latest_quotes"))
+    result = conn.execute(text("""
+        INSERT INTO latest_quotes (counter_id, latest_date, latest_price, previous_date, previous_price)
+        SELECT t.counter_id, l.trade_date, l.close_mwk, p.trade_date, p.close_mwk
+        FROM tickers t
+        CROSS JOIN LATERAL (SELECT trade_date, close_mwk FROM daily_prices d
+                            WHERE d.counter_id = t.counter_id
+                            ORDER BY trade_date DESC LIMIT 1) l
+        LEFT JOIN LATERAL (SELECT trade_date, close_mwk FROM daily_prices d
+                           WHERE d.counter_id = t.counter_id AND d.trade_date < l.trade_date
+                           ORDER BY trade_date DESC LIMIT 1) p ON TRUE
+    """))
+    return result.rowcount
+
+
+def refresh_counter_stats(conn) -> int:
+    """Rebuild record counts and first / last trade dates per counter. Returns the number of counters."""
+    conn.execute(text("DELETE FROM counter_stats"))
+    result = conn.execute(text("""
+        INSERT INTO counter_stats (counter_id, total_records, first_trade_date, last_trade_date)
+        SELECT counter_id, COUNT(*), MIN(trade_date), MAX(trade_date)
+        FROM daily_prices
+        GROUP BY counter_id
+    """))
+    return result.rowcount
+
+
+def refresh_price_bars(conn, since: Optional[date] = None) -> int:
+    """
+    Rebuild weekly, monthly and yearly bars touched by data on or after ``since``.
+
+    With ``since=None`` every bar is rebuilt; after a daily load only the
+    current week/month/year of each counter is recomputed. Returns the
+    number of bars written.
+    """
+    written = 0
+    for interval, unit in BAR_INTERVALS.items():
+        params = {"bar_interval": interval}
+        delete = "DELETE FROM price_bars WHERE bar_interval = :bar_interval"
+        if since is not None:
+            delete += f" AND period_start >= date_trunc('{unit}', CAST(:since AS date))::date"
+            params["since"] = since
+        conn.execute(text(delete), params)
+
+        sql, params = build_bars_rollup_query(interval, since = since)
+        result = conn.execute(text(
+            "INSERT INTO price_bars (counter_id, bar_interval, period_start, period_end, "
+            "open, high, low, close, volume, trading_days) " + sql), params)
+        written += result.rowcount
+    return written
+
+
+def bump_data_version(conn) -> int:
+    """Advance the data version so cached API responses are invalidated. Returns the new version."""
+    return conn.execute(text(
+        "UPDATE data_version SET version = version + 1, bumped_at = now() WHERE id = 1 RETURNING version"
+    )).scalar_one()
+
+
+def refresh_derived(engine, since: Optional[date] = None) -> dict:
+    """
+    Refresh every derived table in one transaction. Call after each load into daily_prices.
+
+    ``since`` is the earliest trade_date touched by the load; rollups before
+    it are left alone (None rebuilds everything).
+    """
+    with engine.begin() as conn:
+        stats = {"latest_quotes": refresh_latest_quotes(conn),
+                 "counter_stats": refresh_counter_stats(conn),
+                 "price_bars": refresh_price_bars(conn, since)}
+        stats["data_version"] = bump_data_version(conn)
+    logger.info("Derived tables refreshed: %s", stats)
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from mse_db import engine
+
+    print(f"✅ Derived tables refreshed: {refresh_derived(engine)}")
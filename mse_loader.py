@@ -0,0 +1,440 @@
+# mse_loader.py
+
+"""
+Bulk loader for daily price reports.
+
+Replaces ``DataFrame.to_sql`` and row-by-row ``UPDATE`` statements: report
+CSVs (``master.csv`` or the per-day files in ``data/csv_files``) are
+normalized, streamed into a temporary staging table with ``COPY FROM STDIN``
+and merged into ``daily_prices`` with one ``INSERT ... ON CONFLICT`` upsert,
+so reloading the full history takes seconds and re-loading a day is a no-op.
+
+For the daily pipeline, ``ingest_reports`` keeps an ingest state in the
+database (file checksums plus the trade_date watermark) and only parses and
+upserts the reports that are new or changed since the previous run. A
+report with counters missing from ``tickers`` is loaded but not recorded,
+so it is read again on every run until its counters can be matched.
+
+Report columns are mapped onto the API schema as follows:
+
+open_mwk   previous_closing_price (the reports carry no opening price)
+high_mwk   daily_range_high
+low_mwk    daily_range_low
+close_mwk  today_closing_price
+volume     volume_traded
+
+Counters are matched to ``tickers`` after stripping report suffixes
+(``NICO TS``, ``Standard CD``, ``FMBTS CA XD``, ...), by ticker or else by
+the first word of the company name; rows of counters that match neither
+are skipped with a warning.
+
+Usage
+-----
+    python mse_loader.py                                  # data/master_csv/master.csv
+    python mse_loader.py data/csv_files/mse-daily-2025-09-19.csv
+    python mse_loader.py --csv-dir data/csv_files         # every daily report
+    python mse_loader.py --incremental                    # only new / changed reports in data/csv_files
+"""
+
+import argparse
+import hashlib
+import io
+import logging
+import re
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import pandas as pd
+from sqlalchemy import text
+
+from mse_derived import bump_data_version, refresh_derived
+from mse_migrations import ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+# ===============================================
+# GLOBAL VARIABLES
+# ===============================================
+DIR_DATA = Path(__file__).resolve().parent / "data"
+MASTER_CSV = DIR_DATA / "master_csv" / "master.csv"
+DIR_REPORTS_CSV = DIR_DATA / "csv_files"
+
+LOAD_COLUMNS = ['counter_id', 'trade_date', 'open_mwk', 'high_mwk', 'low_mwk', 'close_mwk', 'volume']
+
+REPORT_COLUMNS = {
+    'previous_closing_price': 'open_mwk',
+    'daily_range_high': 'high_mwk',
+    'daily_range_low': 'low_mwk',
+    'today_closing_price': 'close_mwk',
+    'volume_traded': 'volume',
+}
+
+# Report spellings of a counter (after suffix stripping) -> ticker
+COUNTER_ALIASES = {
+    'FMB': 'FMBCH',
+    'FMBTS': 'FMBCH',
+    'OML': 'OMU',
+    'STANDARDCD': 'STANDARD',
+    'STANDARDTS': 'STANDARD',
+    'SUNBIRDCD': 'SUNBIRD',
+    'SUNBIRDXD': 'SUNBIRD',
+}
+
+# tickers columns written by upsert_tickers -> SQL type (added when missing)
+TICKER_COLUMNS = {
+    'counter_id': 'TEXT',
+    'ticker': 'TEXT',
+    'name': 'TEXT',
+    'date_listed': 'TEXT',
+    'listing_price': 'DOUBLE PRECISION',
+    'sector': 'TEXT',
+}
+
+STAGING_DDL = """
+    CREATE TEMP TABLE daily_prices_staging (
+        row_no      BIGINT,
+        counter_id  TEXT,
+        trade_date  DATE,
+        open_mwk    DOUBLE PRECISION,
+        high_mwk    DOUBLE PRECISION,
+        low_mwk     DOUBLE PRECISION,
+        close_mwk   DOUBLE PRECISION,
+        volume      DOUBLE PRECISION
+    ) ON COMMIT DROP
+"""
+
+# One row per (counter, day): prefer a row with a closing price, then the last one read
+UPSERT_SQL = """
+    INSERT INTO daily_prices (counter_id, trade_date, open_mwk, high_mwk, low_mwk, close_mwk, volume)
+    SELECT DISTINCT ON (counter_id, trade_date)
+           counter_id, trade_date, open_mwk, high_mwk, low_mwk, close_mwk, volume
+    FROM daily_prices_staging
+    ORDER BY counter_id, trade_date, close_mwk IS NULL, row_no DESC
+    ON CONFLICT (counter_id, trade_date) DO UPDATE SET
+        open_mwk = EXCLUDED.open_mwk,
+        high_mwk = EXCLUDED.high_mwk,
+        low_mwk = EXCLUDED.low_mwk,
+        close_mwk = EXCLUDED.close_mwk,
+        volume = EXCLUDED.volume
+    WHERE (daily_prices.open_mwk, daily_prices.high_mwk, daily_prices.low_mwk,
+           daily_prices.close_mwk, daily_prices.volume)
+          IS DISTINCT FROM
+          (EXCLUDED.open_mwk, EXCLUDED.high_mwk, EXCLUDED.low_mwk, EXCLUDED.close_mwk, EXCLUDED.volume)
+"""
+
+
+# ===============================================
+# NORMALIZATION
+# ===============================================
+def normalize_counter(counter: str) -> str:
+    """Report counter name to ticker: ``'Sunbird CD'`` -> ``'SUNBIRD'``, ``'NBS-LA*'`` -> ``'NBS'``."""
+    tokens = re.sub(r'[^A-Z]', ' ', str(counter).upper()).split()
+    base = tokens[0] if tokens else ''
+    return COUNTER_ALIASES.get(base, base)
+
+
+def counter_lookup(tickers: Iterable[tuple]) -> Dict[str, str]:
+    """
+    Report counter -> counter_id from ``(ticker, name, counter_id)`` rows of ``tickers``.
+
+    Counters match the upper-cased ticker; failing that, the first word of a
+    company name when no other company starts with it. The listing stores
+    ``AIRTELL`` for the ``AIRTEL`` of the reports, for instance.
+    """
+    tickers = list(tickers)
+    lookup = {str(ticker).upper(): counter_id for ticker, _, counter_id in tickers if ticker}
+    first_words: Dict[str, List[str]] = {}
+    for _, name, counter_id in tickers:
+        words = re.sub(r'[^A-Z]', ' ', str(name or '').upper()).split()
+        if words:
+            first_words.setdefault(words[0], []).append(counter_id)
+    for word, ids in first_words.items():
+        if len(ids) == 1:
+            lookup.setdefault(word, ids[0])
+    return lookup
+
+
+def to_number(series: pd.Series) -> pd.Series:
+    """First number in each cell (``'20000( )'`` -> 20000.0, ``'1,234.5'`` -> 1234.5); NaN otherwise."""
+    extracted = series.astype(str).str.replace(',', '', regex=False).str.extract(r'(-?\d+(?:\.\d+)?)')[0]
+    return pd.to_numeric(extracted, errors='coerce')
+
+
+def normalize_reports(df: pd.DataFrame, counter_ids: Dict[str, str]) -> pd.DataFrame:
+    """
+    Map raw report rows onto ``LOAD_COLUMNS``.
+
+    Rows whose counter is not in ``counter_ids`` (ticker -> counter_id) or
+    whose trade_date cannot be parsed are dropped.
+    """
+    out = pd.DataFrame({
+        'counter_id': df['counter'].map(normalize_counter).map(counter_ids),
+        'trade_date': pd.to_datetime(df['trade_date'], format='mixed', errors='coerce').dt.date,
+    })
+    for src, dst in REPORT_COLUMNS.items():
+        out[dst] = to_number(df[src])
+    return out.dropna(subset=['counter_id', 'trade_date'])[LOAD_COLUMNS]
+
+
+def read_reports(paths: Iterable[Union[str, Path]]) -> pd.DataFrame:
+    """Concatenate report CSVs, keeping file order (later files win on duplicates)."""
+    frames = [pd.read_csv(p, dtype=str) for p in paths]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['counter', 'trade_date', *REPORT_COLUMNS])
+
+
+# ===============================================
+# LOADING
+# ===============================================
+def copy_frame(conn, df: pd.DataFrame, table: str, columns: List[str]):
+    """Stream ``df`` into ``table`` with ``COPY FROM STDIN`` on the connection's psycopg2 cursor."""
+    buf = io.StringIO()
+    df[columns].to_csv(buf, index=False, header=False, na_rep='')
+    buf.seek(0)
+    with conn.connection.cursor() as cur:
+        cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def upsert_prices(conn, prices: pd.DataFrame) -> int:
+    """COPY normalized rows into staging and upsert them into daily_prices. Returns rows inserted or changed."""
+    conn.execute(text(STAGING_DDL))
+    staged = prices.assign(row_no=range(len(prices)))
+    copy_frame(conn, staged, "daily_prices_staging", ['row_no', *LOAD_COLUMNS])
+    return conn.execute(text(UPSERT_SQL)).rowcount
+
+
+def read_counter_ids(conn) -> Dict[str, str]:
+    return counter_lookup(conn.execute(text("SELECT ticker, name, counter_id FROM tickers")).all())
+
+
+def unmatched_counters(raw: pd.DataFrame, counter_ids: Dict[str, str]) -> Dict[str, int]:
+    """Row count per report counter that ``counter_ids`` cannot map."""
+    counters = raw['counter'].map(normalize_counter)
+    return counters[~counters.isin(counter_ids.keys())].value_counts().to_dict()
+
+
+def load_frames(conn, raw: pd.DataFrame) -> dict:
+    """Normalize raw report rows and upsert them on ``conn`` (caller owns the transaction)."""
+    counter_ids = read_counter_ids(conn)
+    return load_normalized(conn, normalize_reports(raw, counter_ids), len(raw), unmatched_counters(raw, counter_ids))
+
+
+def load_normalized(conn, prices: pd.DataFrame, rows_read: int, unmatched: Dict[str, int]) -> dict:
+    """Upsert rows from ``normalize_reports`` on ``conn``; ``rows_read``/``unmatched`` describe the raw input."""
+    if unmatched:
+        logger.warning("Skipped rows of counters not in tickers: %s", unmatched)
+    stats = {"rows_read": rows_read, "rows_skipped": rows_read - len(prices), "unmatched_counters": unmatched,
+             "upserted": 0, "first_date": None, "last_date": None}
+    if not prices.empty:
+        first, last = prices['trade_date'].min(), prices['trade_date'].max()
+        stats.update(first_date=first, last_date=last,
+                     partitions_created=ensure_partitions(conn, first, last),
+                     upserted=upsert_prices(conn, prices))
+    return stats
+
+
+def load_prices(engine, paths: Iterable[Union[str, Path]], refresh: bool = True) -> dict:
+    """
+    Load report CSVs into ``daily_prices`` in one transaction.
+
+    Creates missing yearly partitions, upserts every row and, unless
+    ``refresh=False``, refreshes the derived tables from the earliest loaded
+    date. Returns load statistics.
+    """
+    t0 = time.perf_counter()
+    paths = [Path(p) for p in paths]
+    raw = read_reports(paths)
+    with engine.begin() as conn:
+        stats = {"files": len(paths), **load_frames(conn, raw)}
+
+    if refresh and stats["upserted"]:
+        stats["derived"] = refresh_derived(engine, since=stats["first_date"])
+    stats["seconds"] = round(time.perf_counter() - t0, 3)
+    logger.info("Loaded prices: %s", stats)
+    return stats
+
+
+# ===============================================
+# INCREMENTAL INGEST
+# ===============================================
+def file_checksum(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def report_date(path: Path) -> Optional[date]:
+    """Trade date from a report file name (``mse-daily-2025-09-19.csv``), or None."""
+    match = re.search(r'(\d{4})-(\d{2})-(\d{2})', path.name)
+    try:
+        return date(*map(int, match.groups())) if match else None
+    except ValueError:
+        return None
+
+
+def validate_report(df: pd.DataFrame) -> Optional[str]:
+    """Reason a report cannot be loaded, or None when it looks sane."""
+    missing = [c for c in ['counter', 'trade_date', *REPORT_COLUMNS] if c not in df.columns]
+    if missing:
+        return f"missing columns {missing}"
+    if df.empty:
+        return "no rows"
+    if pd.to_datetime(df['trade_date'], format='mixed', errors='coerce').isna().all():
+        return "no parseable trade_date"
+    return None
+
+
+def ingest_reports(engine, csv_dir: Union[str, Path] = DIR_REPORTS_CSV, refresh: bool = True) -> dict:
+    """
+    Load only the daily report CSVs that are new or changed since the last run.
+
+    ``ingest_files`` records the checksum, size and mtime of every loaded
+    file. Unchanged files are skipped on size + mtime alone (no read), files
+    whose stat changed are re-hashed, and only files with a new checksum are
+    parsed, validated and upserted. File records are written in the same
+    transaction as the prices, so a failed run is simply retried. A file
+    with counters that cannot be mapped to ``tickers`` is upserted but not
+    recorded (listed under ``incomplete``), so it is loaded again once the
+    mapping is fixed; ``rows_loaded`` counts the mapped rows of a file. The
+    watermark (latest loaded trade_date) is reported for monitoring.
+    """
+    t0 = time.perf_counter()
+    files = sorted(Path(csv_dir).glob("*.csv"))
+    with engine.begin() as conn:
+        known = {name: (sha, size, mtime) for name, sha, size, mtime in conn.execute(text(
+            "SELECT file_name, sha256, size_bytes, mtime_ns FROM ingest_files")).all()}
+        watermark = conn.execute(text("SELECT MAX(trade_date) FROM ingest_files")).scalar()
+
+        candidates, unchanged = [], 0
+        for path in files:
+            st = path.stat()
+            prev = known.get(path.name)
+            if prev and (prev[1], prev[2]) == (st.st_size, st.st_mtime_ns):
+                unchanged += 1
+                continue
+            sha = file_checksum(path)
+            if prev and prev[0] == sha:
+                #touched but identical: remember the new stat so it is not hashed again
+                conn.execute(text("UPDATE ingest_files SET size_bytes = :size, mtime_ns = :mtime WHERE file_name = :name"),
+                             {"size": st.st_size, "mtime": st.st_mtime_ns, "name": path.name})
+                unchanged += 1
+                continue
+            candidates.append((path, sha, st))
+
+        counter_ids = read_counter_ids(conn)
+        frames, records, rejected, incomplete, unmatched = [], [], {}, [], {}
+        rows_read = 0
+        for path, sha, st in candidates:
+            df = pd.read_csv(path, dtype=str)
+            problem = validate_report(df)
+            if problem:
+                rejected[path.name] = problem
+                continue
+            prices = normalize_reports(df, counter_ids)
+            frames.append(prices)
+            rows_read += len(df)
+            missing = unmatched_counters(df, counter_ids)
+            if missing:
+                #loaded but not recorded: read again until every counter maps to a ticker
+                incomplete.append(path.name)
+                for counter, n in missing.items():
+                    unmatched[counter] = unmatched.get(counter, 0) + n
+                continue
+            records.append({"name": path.name, "sha": sha, "size": st.st_size, "mtime": st.st_mtime_ns,
+                            "trade_date": report_date(path), "rows": len(prices)})
+
+        stats = {"files": len(files), "unchanged": unchanged, "loaded_files": len(records),
+                 "incomplete": incomplete, "rejected": rejected, "previous_watermark": watermark}
+        if frames:
+            stats.update(load_normalized(conn, pd.concat(frames, ignore_index=True), rows_read, unmatched))
+        else:
+            stats["upserted"] = 0
+        if records:
+            conn.execute(text(
+                "INSERT INTO ingest_files (file_name, sha256, size_bytes, mtime_ns, trade_date, rows_loaded) "
+                "VALUES (:name, :sha, :size, :mtime, :trade_date, :rows) "
+                "ON CONFLICT (file_name) DO UPDATE SET sha256 = EXCLUDED.sha256, size_bytes = EXCLUDED.size_bytes, "
+                "mtime_ns = EXCLUDED.mtime_ns, trade_date = EXCLUDED.trade_date, "
+                "rows_loaded = EXCLUDED.rows_loaded, loaded_at = now()"), records)
+        stats["watermark"] = conn.execute(text("SELECT MAX(trade_date) FROM ingest_files")).scalar()
+
+    for name, problem in rejected.items():
+        logger.warning("Rejected %s: %s", name, problem)
+    if refresh and stats["upserted"]:
+        stats["derived"] = refresh_derived(engine, since=stats["first_date"])
+    stats["seconds"] = round(time.perf_counter() - t0, 3)
+    logger.info("Ingested reports: %s", stats)
+    return stats
+
+
+def update_sectors(engine, sectors: Union[pd.DataFrame, Dict[str, str]]) -> int:
+    """
+    Set ``tickers.sector`` for many tickers in one statement.
+
+    ``sectors`` is a ticker -> sector mapping or a DataFrame with ``ticker``
+    and ``sector`` columns. Returns the number of tickers updated; if any
+    changed, the data version is bumped so cached ``/companies`` responses
+    are dropped.
+    """
+    if isinstance(sectors, pd.DataFrame):
+        sectors = dict(zip(sectors['ticker'], sectors['sector']))
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE tickers ADD COLUMN IF NOT EXISTS sector TEXT"))
+        result = conn.execute(text(
+            "UPDATE tickers t SET sector = v.sector "
+            "FROM unnest(CAST(:tickers AS text[]), CAST(:sectors AS text[])) AS v(ticker, sector) "
+            "WHERE t.ticker = v.ticker AND t.sector IS DISTINCT FROM v.sector"),
+            {"tickers": list(sectors), "sectors": list(sectors.values())})
+        if result.rowcount:
+            bump_data_version(conn)
+    return result.rowcount
+
+
+def upsert_tickers(engine, tickers: pd.DataFrame) -> int:
+    """
+    Insert or update ``tickers`` rows keyed on ``counter_id``, in one statement.
+
+    Unlike ``to_sql(if_exists="replace")`` this keeps the table's primary key
+    and the columns the frame does not carry. ``tickers`` needs ``counter_id``
+    and ``ticker``; of the other ``TICKER_COLUMNS`` only those present are
+    written (and added to the table if missing).
+    Returns the number of tickers inserted or changed; if any, the data
+    version is bumped so cached ``/companies`` responses are dropped.
+    """
+    columns = [c for c in TICKER_COLUMNS if c in tickers.columns]
+    arrays = {c: [None if pd.isna(v) else (float(v) if TICKER_COLUMNS[c] != 'TEXT' else str(v))
+                  for v in tickers[c]] for c in columns}
+    values = ", ".join(f"CAST(:{c} AS {TICKER_COLUMNS[c]}[])" for c in columns)
+    updates = [c for c in columns if c != 'counter_id']
+    sql = (f"INSERT INTO tickers ({', '.join(columns)}) "
+           f"SELECT * FROM unnest({values}) "
+           f"ON CONFLICT (counter_id) DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in updates)} "
+           f"WHERE ({', '.join('tickers.' + c for c in updates)}) "
+           f"IS DISTINCT FROM ({', '.join('EXCLUDED.' + c for c in updates)})")
+    with engine.begin() as conn:
+        for c in updates:
+            conn.execute(text(f"ALTER TABLE tickers ADD COLUMN IF NOT EXISTS {c} {TICKER_COLUMNS[c]}"))
+        result = conn.execute(text(sql), arrays)
+        if result.rowcount:
+            bump_data_version(conn)
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", type=Path, help="report CSV files (default: master.csv)")
+    parser.add_argument("--csv-dir", type=Path, help="load every *.csv in this directory")
+    parser.add_argument("--incremental", action="store_true",
+                        help="load only new or changed reports from --csv-dir (default data/csv_files)")
+    parser.add_argument("--no-refresh", action="store_true", help="skip refreshing the derived tables")
+    args = parser.parse_args()
+
+    from mse_db import engine
+    from mse_migrations import migrate
+
+    migrate(engine)
+    if args.incremental:
+        print(f"✅ {ingest_reports(engine, args.csv_dir or DIR_REPORTS_CSV, refresh=not args.no_refresh)}")
+    else:
+        paths = list(args.paths) + (sorted(args.csv_dir.glob("*.csv")) if args.csv_dir else [])
+        print(f"✅ {load_prices(engine, paths or [MASTER_CSV], refresh=not args.no_refresh)}")
@@ -0,0 +1,362 @@
+# mse_migrations.py
+
+"""
+Versioned schema migrations for the MSE database.
+
+Each migration is a numbered list of idempotent statements. Applied versions
+are recorded in ``schema_migrations`` and the whole run holds a PostgreSQL
+advisory lock, so several API workers starting together (or a worker and the
+CLI) never apply the same step twice. Everything runs in one transaction:
+either all pending migrations are applied or none is.
+
+Indexing follows the API access patterns:
+
+* ``(counter_id, trade_date)`` primary key: per-ticker ranges, cursors,
+  LATERAL latest-quote lookups and the batch endpoint.
+* ``(trade_date, counter_id) INCLUDE (OHLCV)``: market-wide scans in date
+  order (export, whole-market cursor pages, rollups ``since`` a date) served
+  as index-only scans. It already orders by ``trade_date``, so a BRIN index
+  would add nothing.
+* yearly range partitions on ``trade_date``: year/month and date-window
+  queries only touch the partitions they need. The loader creates
+  partitions on demand with ``ensure_partitions``; ``check_pruning``
+  verifies with EXPLAIN that the API queries prune.
+
+Usage
+-----
+    python mse_migrations.py            # apply pending migrations
+    python mse_migrations.py status     # list applied / pending versions
+    python mse_migrations.py pruning    # EXPLAIN the API queries and check partition pruning
+    MSE_MIGRATE_ON_STARTUP=0            # do not migrate when the API starts (default 1)
+"""
+
+import argparse
+import json
+import logging
+import os
+from datetime import date
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+MSE_MIGRATE_ON_STARTUP = os.getenv("MSE_MIGRATE_ON_STARTUP", "1").strip().lower() in ("1", "true", "yes")
+
+# pg_advisory_xact_lock key shared by every process that migrates this database
+MIGRATION_LOCK_KEY = 0x4D5345
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    statements: List[str]
+
+
+def _add_primary_key(table: str, columns: str) -> str:
+    """DO block adding a primary key unless the table already has one."""
+    return f"""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint
+                       WHERE conrelid = '{table}'::regclass AND contype = 'p') THEN
+            ALTER TABLE {table} ADD PRIMARY KEY ({columns});
+        END IF;
+    END $$
+    """
+
+
+# ===============================================
+# MIGRATIONS (append only, never edit an applied one)
+# ===============================================
+MIGRATIONS = [
+    Migration(1, "base tables", [
+        """
+        CREATE TABLE IF NOT EXISTS tickers (
+            counter_id      TEXT PRIMARY KEY,
+            ticker          TEXT NOT NULL,
+            name            TEXT,
+            date_listed     TEXT,
+            listing_price   DOUBLE PRECISION,
+            sector          TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS daily_prices (
+            counter_id      TEXT NOT NULL,
+            trade_date      DATE NOT NULL,
+            open_mwk        DOUBLE PRECISION,
+            high_mwk        DOUBLE PRECISION,
+            low_mwk         DOUBLE PRECISION,
+            close_mwk       DOUBLE PRECISION,
+            volume          DOUBLE PRECISION,
+            PRIMARY KEY (counter_id, trade_date)
+        )
+        """,
+    ]),
+    Migration(2, "keys on tables created by to_sql", [
+        # to_sql writes dates as TIMESTAMP (or TEXT) and creates no constraints
+        """
+        DO $$
+        BEGIN
+            IF (SELECT data_type FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'daily_prices'
+                  AND column_name = 'trade_date') <> 'date' THEN
+                ALTER TABLE daily_prices ALTER COLUMN trade_date TYPE DATE USING trade_date::date;
+            END IF;
+        END $$
+        """,
+        # rows that would violate the key: keep the last loaded copy of a (counter, date)
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint
+                           WHERE conrelid = 'daily_prices'::regclass AND contype = 'p') THEN
+                DELETE FROM daily_prices WHERE counter_id IS NULL OR trade_date IS NULL;
+                DELETE FROM daily_prices a USING daily_prices b
+                WHERE a.counter_id = b.counter_id AND a.trade_date = b.trade_date AND a.ctid < b.ctid;
+            END IF;
+        END $$
+        """,
+        _add_primary_key("daily_prices", "counter_id, trade_date"),
+        _add_primary_key("tickers", "counter_id"),
+    ]),
+    Migration(3, "covering index for market-wide date scans", [
+        """
+        CREATE INDEX IF NOT EXISTS daily_prices_trade_date_counter_idx
+        ON daily_prices (trade_date, counter_id)
+        INCLUDE (open_mwk, high_mwk, low_mwk, close_mwk, volume)
+        """,
+    ]),
+    Migration(4, "derived tables", [
+        """
+        CREATE TABLE IF NOT EXISTS latest_quotes (
+            counter_id      TEXT PRIMARY KEY,
+            latest_date     DATE NOT NULL,
+            latest_price    DOUBLE PRECISION,
+            previous_date   DATE,
+            previous_price  DOUBLE PRECISION,
+            refreshed_at    TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS counter_stats (
+            counter_id        TEXT PRIMARY KEY,
+            total_records     BIGINT NOT NULL,
+            first_trade_date  DATE,
+            last_trade_date   DATE,
+            refreshed_at      TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS price_bars (
+            counter_id      TEXT NOT NULL,
+            bar_interval    TEXT NOT NULL,
+            period_start    DATE NOT NULL,
+            period_end      DATE NOT NULL,
+            open            DOUBLE PRECISION,
+            high            DOUBLE PRECISION,
+            low             DOUBLE PRECISION,
+            close           DOUBLE PRECISION,
+            volume          DOUBLE PRECISION,
+            trading_days    INTEGER NOT NULL,
+            PRIMARY KEY (counter_id, bar_interval, period_start)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            id              INTEGER PRIMARY KEY CHECK (id = 1),
+            version         BIGINT NOT NULL,
+            bumped_at       TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        "INSERT INTO data_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING",
+    ]),
+    Migration(5, "yearly range partitions on daily_prices", [
+        # swap the plain table for a partitioned one with a partition per year of data
+        """
+        DO $$
+        DECLARE
+            lo INTEGER;
+            hi INTEGER;
+        BEGIN
+            IF (SELECT relkind FROM pg_class WHERE oid = 'daily_prices'::regclass) = 'p' THEN
+                RETURN;
+            END IF;
+            ALTER TABLE daily_prices RENAME TO daily_prices_unpartitioned;
+            CREATE TABLE daily_prices (LIKE daily_prices_unpartitioned INCLUDING DEFAULTS)
+                PARTITION BY RANGE (trade_date);
+            SELECT COALESCE(MIN(EXTRACT(YEAR FROM trade_date)), EXTRACT(YEAR FROM now()))::int,
+                   COALESCE(MAX(EXTRACT(YEAR FROM trade_date)), EXTRACT(YEAR FROM now()))::int
+            INTO lo, hi FROM daily_prices_unpartitioned;
+            FOR y IN lo..hi LOOP
+                EXECUTE format('CREATE TABLE daily_prices_%s PARTITION OF daily_prices FOR VALUES FROM (%L) TO (%L)',
+                               y, make_date(y, 1, 1), make_date(y + 1, 1, 1));
+            END LOOP;
+            INSERT INTO daily_prices SELECT * FROM daily_prices_unpartitioned;
+            DROP TABLE daily_prices_unpartitioned;
+        END $$
+        """,
+        # keys and indexes are declared on the parent and created on every partition
+        _add_primary_key("daily_prices", "counter_id, trade_date"),
+        """
+        CREATE INDEX IF NOT EXISTS daily_prices_trade_date_counter_idx
+        ON daily_prices (trade_date, counter_id)
+        INCLUDE (open_mwk, high_mwk, low_mwk, close_mwk, volume)
+        """,
+    ]),
+    Migration(6, "ingest state", [
+        """
+        CREATE TABLE IF NOT EXISTS ingest_files (
+            file_name       TEXT PRIMARY KEY,
+            sha256          TEXT NOT NULL,
+            size_bytes      BIGINT NOT NULL,
+            mtime_ns        BIGINT NOT NULL,
+            trade_date      DATE,
+            rows_loaded     INTEGER NOT NULL,
+            loaded_at       TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ingest_files_trade_date_idx ON ingest_files (trade_date)",
+    ]),
+    # Files used to be recorded even when rows of unmatched counters were dropped, with
+    # rows_loaded counting raw rows; forget them so the next ingest re-reads every report once
+    Migration(7, "re-ingest reports recorded before unmatched counters were tracked", [
+        "DELETE FROM ingest_files",
+    ]),
+]
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version     INTEGER PRIMARY KEY,
+        name        TEXT NOT NULL,
+        applied_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+
+# ===============================================
+# RUNNER
+# ===============================================
+def migrate(engine, target: Optional[int] = None) -> List[int]:
+    """
+    Apply every pending migration up to ``target`` (all when None).
+
+    Safe to call on every start: applied versions are skipped and concurrent
+    callers wait on the advisory lock. Returns the versions applied now.
+    """
+    applied_now = []
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        conn.execute(text(SCHEMA_MIGRATIONS_DDL))
+        applied = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+        for m in MIGRATIONS:
+            if m.version in applied or (target is not None and m.version > target):
+                continue
+            logger.info("Applying migration %d: %s", m.version, m.name)
+            for statement in m.statements:
+                conn.execute(text(statement))
+            conn.execute(text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                         {"version": m.version, "name": m.name})
+            applied_now.append(m.version)
+    return applied_now
+
+
+def status(engine) -> List[dict]:
+    """Every known migration with its ``applied_at`` timestamp (None when pending)."""
+    with engine.begin() as conn:
+        conn.execute(text(SCHEMA_MIGRATIONS_DDL))
+        applied = dict(conn.execute(text("SELECT version, applied_at FROM schema_migrations")).all())
+    return [{"version": m.version, "name": m.name, "applied_at": applied.get(m.version)} for m in MIGRATIONS]
+
+
+# ===============================================
+# PARTITIONS
+# ===============================================
+def ensure_partitions(conn, start: date, end: date) -> List[str]:
+    """
+    Create the yearly ``daily_prices`` partitions covering ``start``..``end`` (inclusive).
+
+    Call before loading rows with those dates; existing partitions are left
+    alone. Returns the partitions that were missing.
+    """
+    existing = set(conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'daily_prices'::regclass")).scalars())
+    created = []
+    for year in range(start.year, end.year + 1):
+        name = f"daily_prices_{year}"
+        if name in existing:
+            continue
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF daily_prices "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"))
+        created.append(name)
+    if created:
+        logger.info("Created partitions: %s", created)
+    return created
+
+
+def partitions_scanned(conn, sql: str, params: dict = None) -> List[str]:
+    """Names of the tables/partitions a query's plan touches (from ``EXPLAIN (FORMAT JSON)``)."""
+    plan = conn.execute(text("EXPLAIN (FORMAT JSON) " + sql), params or {}).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    found = set()
+
+    def walk(node):
+        if "Relation Name" in node:
+            found.add(node["Relation Name"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return sorted(found)
+
+
+def check_pruning(engine) -> List[dict]:
+    """
+    EXPLAIN the date-bounded API queries and check each one only scans the
+    partitions of the requested period. Returns one result per query (``ok``).
+    """
+    from mse_queries import build_daily_prices_query, build_period_prices_query, build_period_summary_query
+
+    with engine.connect() as conn:
+        counter_id, last = conn.execute(text(
+            "SELECT counter_id, MAX(trade_date) FROM daily_prices GROUP BY counter_id ORDER BY 2 DESC LIMIT 1")).one()
+        year = last.year
+        cases = {
+            "/prices/range year": (build_period_prices_query(counter_id, year), [year]),
+            "/prices/range month": (build_period_prices_query(counter_id, year, last.month), [year]),
+            "/prices/range summary": (build_period_summary_query(counter_id, year), [year]),
+            "/prices/daily window": (build_daily_prices_query(counter_id, date(year - 1, 7, 1), date(year, 6, 30), 100),
+                                     [year - 1, year]),
+        }
+        results = []
+        for name, ((sql, params), years) in cases.items():
+            scanned = partitions_scanned(conn, sql, params)
+            expected = [f"daily_prices_{y}" for y in years]
+            results.append({"query": name, "expected": expected, "scanned": scanned, "ok": scanned == expected})
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status", "pruning"])
+    parser.add_argument("--target", type=int, default=None, help="stop after this version")
+    args = parser.parse_args()
+
+    from mse_db import engine
+
+    if args.command == "pruning":
+        results = check_pruning(engine)
+        for r in results:
+            print(f"{'✅' if r['ok'] else '❌'} {r['query']:<24} scanned {r['scanned']}")
+        raise SystemExit(0 if all(r["ok"] for r in results) else 1)
+    elif args.command == "status":
+        for row in status(engine):
+            print(f"{row['version']:>4}  {'applied ' + str(row['applied_at']) if row['applied_at'] else 'pending':<40}  {row['name']}")
+    else:
+        versions = migrate(engine, args.target)
+        print(f"✅ Applied migrations: {versions}" if versions else "✅ Schema is up to date")
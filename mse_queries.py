@@ -0,0 +1,326 @@
+# mse_queries.py
+
+"""
+Parameterized SQL builders for the MSE API.
+
+Every builder returns a ``(sql, params)`` pair ready for
+``pd.read_sql(text(sql), con=engine, params=params)``, so filtering, ordering
+and limiting happen in PostgreSQL and only the needed rows leave the database.
+"""
+
+import base64
+import json
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+# ===============================================
+# GLOBAL VARIABLES
+# ===============================================
+# OHLCV columns of the daily_prices table used by the range/latest endpoints
+PRICE_COLUMNS = ['trade_date', 'open_mwk', 'high_mwk', 'low_mwk', 'close_mwk', 'volume']
+
+# Bar intervals exposed by /prices/bars -> date_trunc unit
+BAR_INTERVALS = {'1w': 'week', '1M': 'month', '1y': 'year'}
+BAR_INTERVAL_PATTERN = '^(1w|1M|1y)$'
+BAR_COLUMNS = ['period_start', 'period_end', 'open', 'high', 'low', 'close', 'volume', 'trading_days']
+
+Query = Tuple[str, Dict[str, object]]
+Cursor = Tuple[date, str]
+# (counter_id, start_date, end_date, limit) of one query in a batch
+PriceWindow = Tuple[str, Optional[date], Optional[date], int]
+
+
+def _select_list(columns: Optional[List[str]]) -> str:
+    return ", ".join(columns) if columns else "*"
+
+
+def period_bounds(year: int, month: Optional[int] = None) -> Tuple[date, date]:
+    """
+    Return the half-open ``[start, end)`` date window covering a year or a month.
+
+    Using a plain range on ``trade_date`` (instead of ``EXTRACT(YEAR ...)``)
+    keeps the predicate sargable, so an index on ``(counter_id, trade_date)``
+    can be used.
+    """
+    if month:
+        start = date(year, month, 1)
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    else:
+        start = date(year, 1, 1)
+        end = date(year + 1, 1, 1)
+    return start, end
+
+
+def encode_cursor(trade_date: date, counter_id: str) -> str:
+    """Opaque pagination cursor for the row ``(trade_date, counter_id)``."""
+    raw = json.dumps([str(trade_date)[:10], counter_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Inverse of ``encode_cursor``; raises ValueError on malformed input."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        trade_date, counter_id = json.loads(raw)
+        return date.fromisoformat(trade_date), str(counter_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def build_daily_prices_query(counter_id: Optional[str],
+                             start_date: Optional[date] = None,
+                             end_date: Optional[date] = None,
+                             limit: Optional[int] = None,
+                             columns: Optional[List[str]] = None,
+                             descending: bool = True,
+                             after: Optional[Cursor] = None) -> Query:
+    """
+    Build the query behind ``/prices/daily`` and ``/prices/export``.
+
+    Parameters
+    ----------
+    counter_id : str, optional
+        Counter identifier from the tickers table; all counters when None.
+    start_date, end_date : date, optional
+        Inclusive bounds on ``trade_date``.
+    limit : int, optional
+        Maximum number of rows to return.
+    columns : List[str], optional
+        Columns to select; all columns when omitted.
+    descending : bool
+        Order by ``(trade_date, counter_id)`` newest first (default) or oldest first.
+    after : (date, str), optional
+        Keyset cursor: only rows strictly after this ``(trade_date, counter_id)``
+        in the chosen order. This is a range condition, not an OFFSET, so a
+        deep page costs the same as the first one.
+
+    Returns
+    -------
+    (str, dict)
+    """
+    clauses = []
+    params: Dict[str, object] = {}
+    if counter_id is not None:
+        clauses.append("counter_id = :counter_id")
+        params["counter_id"] = counter_id
+    if start_date:
+        clauses.append("trade_date >= :start_date")
+        params["start_date"] = start_date
+    if end_date:
+        clauses.append("trade_date <= :end_date")
+        params["end_date"] = end_date
+
+    op = '<' if descending else '>'
+    if after is not None:
+        params["after_date"] = after[0]
+        if counter_id is not None:
+            # counter_id is fixed, so the key reduces to trade_date alone
+            clauses.append(f"trade_date {op} :after_date")
+        else:
+            clauses.append(f"(trade_date, counter_id) {op} (:after_date, :after_counter_id)")
+            params["after_counter_id"] = after[1]
+
+    direction = 'DESC' if descending else 'ASC'
+    sql = f"SELECT {_select_list(columns)} FROM daily_prices "
+    if clauses:
+        sql += f"WHERE {' AND '.join(clauses)} "
+    sql += f"ORDER BY trade_date {direction}, counter_id {direction}"
+    if limit is not None:
+        sql += " LIMIT :limit"
+        params["limit"] = int(limit)
+    return sql, params
+
+
+def build_batch_prices_query(windows: List[PriceWindow],
+                             columns: Optional[List[str]] = None,
+                             descending: bool = True) -> Query:
+    """
+    Resolve several ``/prices/daily`` queries in one statement.
+
+    The windows are passed as parallel arrays and unnested; each one drives a
+    LATERAL index scan on ``(counter_id, trade_date)`` with its own date bounds
+    and LIMIT. The extra ``batch_index`` column (0-based position of the
+    window) lets the caller regroup the rows, newest first within a window
+    (oldest first, and the LIMIT keeps the oldest rows, unless ``descending``).
+    Only ``columns`` (default ``PRICE_COLUMNS``, which must include
+    ``trade_date``) are returned, so no table column can clash with names the
+    caller adds, such as ``ticker``.
+    """
+    columns = columns or PRICE_COLUMNS
+    direction = 'DESC' if descending else 'ASC'
+    counter_ids, starts, ends, limits = (list(c) for c in zip(*windows))
+    sql = ("SELECT q.batch_index - 1 AS batch_index, "
+           f"{_select_list(['p.' + c for c in columns])} "
+           "FROM unnest(CAST(:counter_ids AS text[]), CAST(:start_dates AS date[]), "
+           "CAST(:end_dates AS date[]), CAST(:limits AS integer[])) "
+           "WITH ORDINALITY AS q(counter_id, start_date, end_date, row_limit, batch_index) "
+           f"CROSS JOIN LATERAL (SELECT {_select_list(columns)} FROM daily_prices d "
+           "WHERE d.counter_id = q.counter_id "
+           "AND (q.start_date IS NULL OR d.trade_date >= q.start_date) "
+           "AND (q.end_date IS NULL OR d.trade_date <= q.end_date) "
+           f"ORDER BY d.trade_date {direction} LIMIT q.row_limit) p "
+           f"ORDER BY q.batch_index, p.trade_date {direction}")
+    params = {"counter_ids": counter_ids, "start_dates": starts, "end_dates": ends,
+              "limits": [int(n) for n in limits]}
+    return sql, params
+
+
+def build_period_prices_query(counter_id: str, year: int, month: Optional[int] = None,
+                              columns: Optional[List[str]] = None) -> Query:
+    """Build the query behind ``/prices/range`` (rows for one year or month, oldest first)."""
+    start, end = period_bounds(year, month)
+    sql = (f"SELECT {_select_list(columns or PRICE_COLUMNS)} FROM daily_prices "
+           "WHERE counter_id = :counter_id "
+           "AND trade_date >= :start_date AND trade_date < :end_date "
+           "ORDER BY trade_date ASC")
+    return sql, {"counter_id": counter_id, "start_date": start, "end_date": end}
+
+
+def build_period_summary_query(counter_id: str, year: int, month: Optional[int] = None) -> Query:
+    """
+    Build a single aggregate over one year or month of a counter.
+
+    Returns one row: period_start, period_end, open (first open), high, low,
+    close (last close), total_volume, vwap (close weighted by volume) and
+    trading_days.
+    """
+    start, end = period_bounds(year, month)
+    sql = ("SELECT MIN(trade_date) AS period_start, MAX(trade_date) AS period_end, "
+           "(ARRAY_AGG(open_mwk ORDER BY trade_date) FILTER (WHERE open_mwk IS NOT NULL))[1] AS open, "
+           "MAX(high_mwk) AS high, MIN(low_mwk) AS low, "
+           "(ARRAY_AGG(close_mwk ORDER BY trade_date DESC) FILTER (WHERE close_mwk IS NOT NULL))[1] AS close, "
+           "SUM(volume) AS total_volume, "
+           "SUM(close_mwk * volume) / NULLIF(SUM(volume) FILTER (WHERE close_mwk IS NOT NULL), 0) AS vwap, "
+           "COUNT(*) AS trading_days "
+           "FROM daily_prices "
+           "WHERE counter_id = :counter_id "
+           "AND trade_date >= :start_date AND trade_date < :end_date")
+    return sql, {"counter_id": counter_id, "start_date": start, "end_date": end}
+
+
+def build_latest_prices_query(counter_id: str, n: int = 2,
+                              columns: Optional[List[str]] = None) -> Query:
+    """Build the query returning the ``n`` most recent rows for a counter."""
+    sql = (f"SELECT {_select_list(columns or PRICE_COLUMNS)} FROM daily_prices "
+           "WHERE counter_id = :counter_id "
+           "ORDER BY trade_date DESC LIMIT :limit")
+    return sql, {"counter_id": counter_id, "limit": int(n)}
+
+
+def build_latest_quotes_query(counter_id: Optional[str] = None) -> Query:
+    """
+    Build the latest/previous close query behind ``/prices/latest``.
+
+    Each counter costs two index probes (newest row, then the row before it)
+    via LATERAL subqueries, so the whole market is answered in one statement
+    without sorting any counter's history. Pass ``counter_id`` to restrict it
+    to one counter on the same path.
+    """
+    sql = ("SELECT t.ticker, t.counter_id, "
+           "l.trade_date AS latest_date, l.close_mwk AS latest_price, "
+           "p.trade_date AS previous_date, p.close_mwk AS previous_price, "
+           "l.close_mwk - p.close_mwk AS change, "
+           "CASE WHEN p.close_mwk = 0 THEN 0 "
+           "ELSE ROUND(((l.close_mwk - p.close_mwk) / p.close_mwk * 100)::numeric, 3) END AS change_percentage "
+           "FROM tickers t "
+           "CROSS JOIN LATERAL (SELECT trade_date, close_mwk FROM daily_prices d "
+           "WHERE d.counter_id = t.counter_id ORDER BY trade_date DESC LIMIT 1) l "
+           "LEFT JOIN LATERAL (SELECT trade_date, close_mwk FROM daily_prices d "
+           "WHERE d.counter_id = t.counter_id AND d.trade_date < l.trade_date "
+           "ORDER BY trade_date DESC LIMIT 1) p ON TRUE ")
+    params: Dict[str, object] = {}
+    if counter_id is not None:
+        sql += "WHERE t.counter_id = :counter_id "
+        params["counter_id"] = counter_id
+    sql += "ORDER BY t.ticker"
+    return sql, params
+
+
+def build_latest_snapshot_query(counter_id: Optional[str] = None) -> Query:
+    """
+    Same output as ``build_latest_quotes_query`` but read from the
+    ``latest_quotes`` snapshot maintained on ingest (one row per counter).
+    """
+    sql = ("SELECT t.ticker, t.counter_id, q.latest_date, q.latest_price, "
+           "q.previous_date, q.previous_price, "
+           "q.latest_price - q.previous_price AS change, "
+           "CASE WHEN q.previous_price = 0 THEN 0 "
+           "ELSE ROUND(((q.latest_price - q.previous_price) / q.previous_price * 100)::numeric, 3) END AS change_percentage "
+           "FROM latest_quotes q JOIN tickers t ON t.counter_id = q.counter_id ")
+    params: Dict[str, object] = {}
+    if counter_id is not None:
+        sql += "WHERE q.counter_id = :counter_id "
+        params["counter_id"] = counter_id
+    sql += "ORDER BY t.ticker"
+    return sql, params
+
+
+def build_bars_rollup_query(interval: str,
+                            counter_id: Optional[str] = None,
+                            since: Optional[date] = None) -> Query:
+    """
+    Aggregate daily rows into OHLCV bars for ``interval`` ('1w', '1M' or '1y').
+
+    Used by the ingest refresh to (re)build ``price_bars`` from ``since`` onwards,
+    and by ``/prices/bars`` as a live fallback before the rollups exist.
+    ``since`` is widened to the start of its period so partial periods are
+    always recomputed whole.
+    """
+    unit = BAR_INTERVALS[interval]
+    clauses, params = [], {"bar_interval": interval}
+    if counter_id is not None:
+        clauses.append("counter_id = :counter_id")
+        params["counter_id"] = counter_id
+    if since is not None:
+        clauses.append(f"trade_date >= date_trunc('{unit}', CAST(:since AS date))::date")
+        params["since"] = since
+    sql = ("SELECT counter_id, CAST(:bar_interval AS text) AS bar_interval, "
+           f"date_trunc('{unit}', trade_date)::date AS period_start, "
+           "MAX(trade_date) AS period_end, "
+           "(ARRAY_AGG(open_mwk ORDER BY trade_date) FILTER (WHERE open_mwk IS NOT NULL))[1] AS open, "
+           "MAX(high_mwk) AS high, MIN(low_mwk) AS low, "
+           "(ARRAY_AGG(close_mwk ORDER BY trade_date DESC) FILTER (WHERE close_mwk IS NOT NULL))[1] AS close, "
+           "SUM(volume) AS volume, COUNT(*) AS trading_days "
+           "FROM daily_prices ")
+    if clauses:
+        sql += f"WHERE {' AND '.join(clauses)} "
+    sql += "GROUP BY counter_id, period_start"
+    return sql, params
+
+
+def build_bars_query(counter_id: str, interval: str,
+                     start_date: Optional[date] = None,
+                     end_date: Optional[date] = None) -> Query:
+    """Read precomputed bars from ``price_bars`` (oldest first)."""
+    clauses = ["counter_id = :counter_id", "bar_interval = :bar_interval"]
+    params: Dict[str, object] = {"counter_id": counter_id, "bar_interval": interval}
+    if start_date:
+        clauses.append("period_end >= :start_date")
+        params["start_date"] = start_date
+    if end_date:
+        clauses.append("period_start <= :end_date")
+        params["end_date"] = end_date
+    sql = (f"SELECT {', '.join(BAR_COLUMNS)} FROM price_bars "
+           f"WHERE {' AND '.join(clauses)} ORDER BY period_start ASC")
+    return sql, params
+
+
+def build_data_version_query() -> Query:
+    """Current data version (bumped by every ingest refresh)."""
+    return "SELECT version FROM data_version WHERE id = 1", {}
+
+
+def build_record_count_query(counter_id: str) -> Query:
+    """
+    Build a ``COUNT(*)`` query for the number of daily records of a counter,
+    with its first and last trade dates (answered from the counter_id index).
+    """
+    return ("SELECT COUNT(*) AS total_records, MIN(trade_date) AS first_trade_date, "
+            "MAX(trade_date) AS last_trade_date FROM daily_prices WHERE counter_id = :counter_id",
+            {"counter_id": counter_id})
+
+
+def build_counter_stats_query(counter_id: str) -> Query:
+    """Same output as ``build_record_count_query``, read from the ``counter_stats`` table maintained on ingest."""
+    return ("SELECT total_records, first_trade_date, last_trade_date FROM counter_stats "
+            "WHERE counter_id = :counter_id", {"counter_id": counter_id})
@@ -0,0 +1,176 @@
+# mse_serialize.py
+
+"""
+Fast JSON serialization of query results.
+
+Instead of ``DataFrame.to_dict(orient='records')`` followed by FastAPI's
+``jsonable_encoder`` walking every value again, columns are handed to orjson
+as NumPy arrays (or flat lists) and encoded to bytes in one pass. NaN and
+missing values become JSON ``null``; numbers stay numbers.
+
+Two layouts are supported:
+
+records  ``[{"trade_date": ..., "close_mwk": ...}, ...]`` (default, as before)
+columns  ``{"trade_date": [...], "close_mwk": [...]}`` (smaller and faster)
+
+Bulk clients can skip JSON altogether and receive Arrow IPC or Parquet,
+negotiated with ``Accept`` or ``?format=`` (requires the optional pyarrow).
+"""
+
+import csv
+import io
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi.responses import Response
+
+try:  # optional: only needed for Arrow IPC / Parquet responses
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+LAYOUTS = ('records', 'columns')
+LAYOUT_PATTERN = '^(records|columns)$'
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any):
+    """Fallback for types orjson does not know (Decimal from NUMERIC columns, pandas NA/NaT, numpy scalars)."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default = _default, option = _OPTIONS)
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson (NumPy arrays, dates and NaN handled natively)."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _column(series: pd.Series, as_list: bool) -> Union[np.ndarray, List[Any]]:
+    kind = series.dtype.kind
+    if kind == 'M':
+        return list(series.dt.to_pydatetime()) if as_list else series.to_numpy()
+    if kind in 'fiub' and not as_list and isinstance(series.dtype, np.dtype):
+        return series.to_numpy()
+    return series.tolist()
+
+
+def frame_columns(df: pd.DataFrame) -> Dict[str, Any]:
+    """Columnar layout: one array per column, NumPy arrays passed straight to orjson."""
+    return {str(c): _column(df[c], as_list = False) for c in df.columns}
+
+
+def frame_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Row layout equivalent to ``to_dict(orient='records')`` without the per-cell boxing."""
+    cols = [str(c) for c in df.columns]
+    values = [_column(df[c], as_list = True) for c in df.columns]
+    return [dict(zip(cols, row)) for row in zip(*values)]
+
+
+def frame_payload(df: pd.DataFrame, layout: str = 'records'):
+    """Return ``df`` in the requested layout, ready for ``FastJSONResponse``."""
+    if layout == 'columns':
+        return frame_columns(df)
+    return frame_records(df)
+
+
+# ===============================================
+# STREAMING (CSV / NDJSON)
+# ===============================================
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+EXPORT_PATTERN = '^(csv|ndjson)$'
+
+
+def csv_chunk(rows) -> bytes:
+    """Encode a batch of rows (or a header) as CSV lines."""
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator = "\n").writerows(rows)
+    return buf.getvalue().encode()
+
+
+def ndjson_chunk(columns: List[str], rows) -> bytes:
+    """Encode a batch of rows as newline-delimited JSON objects."""
+    return b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def encode_chunks(chunks, fmt: str):
+    """Turn ``iter_chunks`` output (columns, then row batches) into CSV/NDJSON bytes."""
+    columns = next(chunks)
+    if fmt == 'csv':
+        yield csv_chunk([columns])
+    for rows in chunks:
+        yield csv_chunk(rows) if fmt == 'csv' else ndjson_chunk(columns, rows)
+
+
+async def aencode_chunks(chunks, fmt: str):
+    """Async counterpart of ``encode_chunks`` for ``aiter_chunks``."""
+    columns = await chunks.__anext__()
+    if fmt == 'csv':
+        yield csv_chunk([columns])
+    async for rows in chunks:
+        yield csv_chunk(rows) if fmt == 'csv' else ndjson_chunk(columns, rows)
+
+
+# ===============================================
+# BINARY FORMATS (Arrow IPC / Parquet)
+# ===============================================
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+PARQUET_MEDIA_TYPE = 'application/vnd.apache.parquet'
+FORMAT_PATTERN = '^(json|arrow|parquet)$'
+
+
+def negotiate_format(accept: Optional[str], fmt: Optional[str] = None) -> str:
+    """
+    Pick the response format: an explicit ``?format=`` wins, then the Accept header.
+
+    Returns one of ``'json'``, ``'arrow'`` or ``'parquet'``.
+    """
+    if fmt:
+        return fmt
+    accept = (accept or '').lower()
+    if ARROW_MEDIA_TYPE in accept:
+        return 'arrow'
+    if PARQUET_MEDIA_TYPE in accept or 'application/x-parquet' in accept:
+        return 'parquet'
+    return 'json'
+
+
+def frame_to_table(df: pd.DataFrame, metadata: Optional[Dict[str, str]] = None):
+    table = pa.Table.from_pandas(df, preserve_index = False)
+    if metadata:
+        merged = dict(table.schema.metadata or {})
+        merged.update({k.encode(): str(v).encode() for k, v in metadata.items()})
+        table = table.replace_schema_metadata(merged)
+    return table
+
+
+def binary_response(df: pd.DataFrame, fmt: str, metadata: Optional[Dict[str, str]] = None) -> Response:
+    """Encode ``df`` as an Arrow IPC stream or a Parquet file, skipping JSON entirely."""
+    table = frame_to_table(df, metadata)
+    sink = pa.BufferOutputStream()
+    if fmt == 'arrow':
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        media_type = ARROW_MEDIA_TYPE
+    else:
+        pq.write_table(table, sink)
+        media_type = PARQUET_MEDIA_TYPE
+    return Response(content = sink.getvalue().to_pybytes(), media_type = media_type)
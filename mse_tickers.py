@@ -0,0 +1,102 @@
+# mse_tickers.py
+
+"""
+Process-wide ticker registry for the MSE API.
+
+The ``tickers`` table is tiny and changes rarely, so it is loaded once and
+served from memory: O(1) lookups by ticker and counter_id, plus a sector
+index. The registry reloads itself when older than its TTL and can be
+invalidated explicitly (see ``POST /admin/tickers/invalidate``).
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Seconds before the registry is reloaded from the database
+TICKER_TTL = float(os.getenv("MSE_TICKER_TTL", "300"))
+
+COMPANY_FIELDS = ['ticker', 'name', 'sector', 'date_listed']
+
+
+class TickerRegistry:
+    """
+    In-memory view of the ``tickers`` table.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        Engine used to (re)load the table.
+    ttl : float
+        Maximum age of the loaded data in seconds; ``0`` disables expiry.
+    """
+
+    def __init__(self, engine, ttl: float = TICKER_TTL):
+        self.engine = engine
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._by_ticker: Dict[str, dict] = {}
+        self._by_counter_id: Dict[str, dict] = {}
+        self._by_sector: Dict[str, List[dict]] = {}
+        self._records: List[dict] = []
+
+    def load(self) -> int:
+        """Read the tickers table and rebuild all indexes. Returns the number of tickers."""
+        df = pd.read_sql("SELECT * FROM tickers", con=self.engine)
+        df = df.replace({np.nan: None})
+        records = df.to_dict(orient='records')
+
+        by_ticker, by_counter_id, by_sector = {}, {}, {}
+        for rec in records:
+            by_ticker[str(rec['ticker']).strip().upper()] = rec
+            by_counter_id[rec['counter_id']] = rec
+            by_sector.setdefault(rec.get('sector'), []).append(rec)
+
+        with self._lock:
+            self._records = records
+            self._by_ticker = by_ticker
+            self._by_counter_id = by_counter_id
+            self._by_sector = by_sector
+            self._loaded_at = time.monotonic()
+        logger.info("Ticker registry loaded %d tickers", len(records))
+        return len(records)
+
+    def invalidate(self):
+        """Mark the registry stale; the next lookup reloads it."""
+        with self._lock:
+            self._loaded_at = None
+
+    @property
+    def is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return bool(self.ttl) and time.monotonic() - self._loaded_at > self.ttl
+
+    def _fresh(self):
+        if self.is_stale:
+            self.load()
+
+    def get(self, ticker: str) -> Optional[dict]:
+        """Return the tickers row for ``ticker`` (case-insensitive) or None."""
+        self._fresh()
+        return self._by_ticker.get(str(ticker).strip().upper())
+
+    def get_by_counter_id(self, counter_id: str) -> Optional[dict]:
+        self._fresh()
+        return self._by_counter_id.get(counter_id)
+
+    def by_sector(self, sector: str) -> List[dict]:
+        self._fresh()
+        return list(self._by_sector.get(sector, []))
+
+    def all(self) -> List[dict]:
+        self._fresh()
+        return list(self._records)
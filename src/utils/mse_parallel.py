@@ -0,0 +1,114 @@
+# mse_parallel.py
+
+"""
+Process-pool fan-out for PDF extraction.
+
+pdfplumber table extraction is CPU-bound, so backfills run one report per
+worker process. Results come back in input order whatever the completion
+order, each report gets its own timeout, and failures are gathered into a
+single log instead of being scattered through the console output.
+
+The per-file timeout uses SIGALRM inside the worker, so it is enforced on
+POSIX only; on Windows reports run without a time limit.
+"""
+
+import math
+import os
+import signal
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional
+
+import pandas as pd
+
+# Default seconds allowed for one report
+PDF_TIMEOUT = 120
+
+
+class PdfResult(NamedTuple):
+    path: Path
+    ok: bool
+    output: object
+    error: Optional[str]
+    seconds: float
+
+
+class FileTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise FileTimeout()
+
+
+def _succeeded(output) -> bool:
+    if isinstance(output, pd.DataFrame):
+        return not output.empty
+    return bool(output)
+
+
+def run_one(func: Callable, path: Path, timeout: Optional[float] = None) -> PdfResult:
+    """Run ``func(path)`` with an optional time limit and capture the outcome."""
+    t0 = time.perf_counter()
+    use_alarm = bool(timeout) and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.alarm(math.ceil(timeout))
+    try:
+        output = func(path)
+        ok = _succeeded(output)
+        error = None if ok else "no table extracted"
+    except FileTimeout:
+        output, ok, error = None, False, f"timed out after {timeout}s"
+    except Exception as e:
+        output, ok = None, False
+        error = "".join(traceback.format_exception_only(type(e), e)).strip()
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, previous)
+    if isinstance(output, pd.DataFrame):
+        output = None if output.empty else output
+    return PdfResult(Path(path), ok, output, error, round(time.perf_counter() - t0, 3))
+
+
+def run_pdf_jobs(func: Callable, paths: List[Path], workers: int = 1,
+                 timeout: Optional[float] = PDF_TIMEOUT) -> List[PdfResult]:
+    """
+    Apply ``func`` to every PDF, in ``workers`` processes when ``workers > 1``.
+
+    ``func`` must be picklable (a module-level function or a ``functools.partial``
+    of one). Returns one ``PdfResult`` per path, in the order of ``paths``.
+    """
+    if workers <= 1 or len(paths) <= 1:
+        return [run_one(func, p, timeout) for p in paths]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        futures = [pool.submit(run_one, func, p, timeout) for p in paths]
+        results = []
+        for p, future in zip(paths, futures):
+            try:
+                results.append(future.result())
+            except BrokenProcessPool as e:  # a worker died (e.g. out of memory)
+                results.append(PdfResult(Path(p), False, None, f"worker crashed: {e}", 0.0))
+    return results
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def write_failure_log(results: List[PdfResult], log_file: Path) -> Optional[Path]:
+    """Write one ``<file name>\\t<reason>`` line per failed report; returns the log path, if any."""
+    failed = [r for r in results if not r.ok]
+    if not failed:
+        return None
+    log_file = Path(log_file)
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_file, "w") as f:
+        for r in failed:
+            f.write(f"{r.path.name}\t{r.error}\n")
+    return log_file
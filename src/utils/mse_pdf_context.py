@@ -0,0 +1,237 @@
+# mse_pdf_context.py
+
+"""
+Parse-once access to a daily report PDF.
+
+Every extraction helper used to open the report on its own: the table pass
+parsed the first page, then ``extract_print_date_time`` re-opened the file
+and parsed the same page again for its text. A ``PdfContext`` opens the
+document once and caches page text, words and tables, so helpers that are
+handed the context share one parse.
+
+Table strategy memo
+-------------------
+Most reports only yield a table with one of the ``TABLE_STRATEGIES``; the
+mid-2018 layouts, for instance, need ``text`` after ``lines`` and
+``lines_strict`` have both come back empty. ``first_tables`` fingerprints
+the page (size, ruling-line count, header words) and tries the strategy
+that last worked for that fingerprint first. The memo is a small JSON file
+(``MSE_TABLE_MEMO``, default ``logs/table_strategy_memo.json``) shared
+across runs; set ``MSE_TABLE_MEMO=""`` to disable it.
+
+Usage
+-----
+    with PdfContext(pdf_path) as ctx:
+        raw = first_tables(ctx, 0)
+        info = extract_print_date_time(ctx)
+"""
+
+import json
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pdfplumber
+
+# Table settings tried in order until one finds a table
+TABLE_STRATEGIES = {
+    "lines": dict(vertical_strategy="lines", horizontal_strategy="lines",
+                  snap_tolerance=3, join_tolerance=3, edge_min_length=3),
+    "lines_strict": dict(vertical_strategy="lines_strict", horizontal_strategy="lines_strict"),
+    "text": dict(vertical_strategy="text", horizontal_strategy="text"),
+}
+
+TABLE_MEMO_FILE = os.getenv("MSE_TABLE_MEMO", str(Path(__file__).resolve().parents[2]
+                                                  / "logs" / "table_strategy_memo.json"))
+# Alphabetic words from the top of the page that identify a layout
+HEADER_WORDS = 8
+
+
+def _settings_key(settings: Optional[dict]) -> Tuple:
+    return tuple(sorted((settings or {}).items()))
+
+
+class PdfContext:
+    """
+    One opened report whose per-page results are computed at most once.
+
+    Parameters
+    ----------
+    pdf_path : str | Path
+        Report to open. The document is parsed lazily on first use and
+        released by ``close()`` (or on leaving a ``with`` block).
+    """
+
+    def __init__(self, pdf_path: str | Path):
+        self.path = Path(pdf_path)
+        self._pdf = None
+        self._text: Dict[int, str] = {}
+        self._words: Dict[int, list] = {}
+        self._tables: Dict[Tuple[int, Tuple], list] = {}
+
+    def __enter__(self) -> "PdfContext":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+    @property
+    def pdf(self):
+        if self._pdf is None:
+            self._pdf = pdfplumber.open(self.path)
+        return self._pdf
+
+    @property
+    def n_pages(self) -> int:
+        return len(self.pdf.pages)
+
+    def page(self, i: int):
+        return self.pdf.pages[i]
+
+    def text(self, i: int) -> str:
+        if i not in self._text:
+            self._text[i] = self.page(i).extract_text() or ""
+        return self._text[i]
+
+    def head_text(self, n_pages: int) -> str:
+        """Text of the first ``n_pages`` pages (at least one), newline-joined."""
+        n = min(max(n_pages, 1), self.n_pages)
+        return "\n".join(self.text(i) for i in range(n))
+
+    def words(self, i: int) -> list:
+        if i not in self._words:
+            self._words[i] = self.page(i).extract_words()
+        return self._words[i]
+
+    def tables(self, i: int, settings: Optional[dict] = None) -> list:
+        """``page.extract_tables(settings)`` for page ``i``, cached per settings."""
+        key = (i, _settings_key(settings))
+        if key not in self._tables:
+            self._tables[key] = self.page(i).extract_tables(table_settings=settings) or []
+        return self._tables[key]
+
+
+@contextmanager
+def using_context(source: "str | Path | PdfContext") -> Iterator[PdfContext]:
+    """Yield ``source`` if it is already a context, else open (and afterwards close) one."""
+    if isinstance(source, PdfContext):
+        yield source
+        return
+    with PdfContext(source) as ctx:
+        yield ctx
+
+
+# ===============================================
+# STRATEGY MEMO
+# ===============================================
+def page_fingerprint(ctx: PdfContext, i: int) -> str:
+    """
+    Layout key for page ``i``: page size, ruling-line count and header words.
+
+    The ruling-line count is bucketed by powers of two so that a report with
+    one more counter (a few more row lines) keeps the same fingerprint; digits
+    are dropped from the header so dates and page numbers do not matter.
+    """
+    page = ctx.page(i)
+    n_edges = len(page.edges)
+    header = [w for w in re.findall(r"[A-Za-z]+", ctx.text(i)) if len(w) > 1][:HEADER_WORDS]
+    return f"{round(page.width)}x{round(page.height)}|e{n_edges.bit_length()}|{' '.join(header).lower()}"
+
+
+class StrategyMemo:
+    """
+    Fingerprint -> table strategy that worked, persisted as JSON.
+
+    Entries look like ``{"strategy": "text", "settings": {...}}``; the stored
+    settings are used as-is, so a layout can be tuned by editing the file.
+    Writes happen only when an entry changes, merge with what is on disk and
+    replace the file atomically, so pool workers can share one memo (a
+    simultaneous update may drop an entry, which is simply relearned).
+    """
+
+    def __init__(self, path: Optional[str | Path] = TABLE_MEMO_FILE):
+        self.path = Path(path) if path else None
+        self._entries: Dict[str, dict] = self._read()
+
+    def _read(self) -> Dict[str, dict]:
+        if self.path is None or not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, fingerprint: str) -> Optional[dict]:
+        return self._entries.get(fingerprint)
+
+    def remember(self, fingerprint: str, strategy: str, settings: dict):
+        entry = {"strategy": strategy, "settings": settings}
+        if self._entries.get(fingerprint) == entry:
+            return
+        self._entries[fingerprint] = entry
+        self.save()
+
+    def save(self):
+        if self.path is None:
+            return
+        entries = {**self._read(), **self._entries}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(entries, indent=2, sort_keys=True))
+        os.replace(tmp, self.path)
+        self._entries = entries
+
+
+_memo: Optional[StrategyMemo] = None
+
+
+def default_memo() -> StrategyMemo:
+    """The process-wide memo backed by ``TABLE_MEMO_FILE`` (loaded on first use)."""
+    global _memo
+    if _memo is None:
+        _memo = StrategyMemo(TABLE_MEMO_FILE)
+    return _memo
+
+
+def _usable_tables(ctx: PdfContext, i: int, settings: dict) -> List[list]:
+    try:
+        return [raw for raw in ctx.tables(i, settings)
+                if raw and len(raw) >= 2 and max(len(r) for r in raw) >= 2]
+    except Exception:
+        return []
+
+
+def first_tables(ctx: PdfContext, i: int, memo: Optional[StrategyMemo] = None) -> List[list]:
+    """
+    Usable tables on page ``i`` from the first strategy that finds any.
+
+    The strategy remembered for the page fingerprint is tried first, then
+    ``TABLE_STRATEGIES`` in order; whichever succeeds is remembered. A usable
+    table has at least two rows and two columns; a strategy that raises is
+    skipped. ``memo`` defaults to ``default_memo()``.
+    """
+    memo = memo or default_memo()
+    fingerprint = page_fingerprint(ctx, i)
+    candidates = list(TABLE_STRATEGIES.items())
+    known = memo.get(fingerprint)
+    if known:
+        candidates.insert(0, (known["strategy"], known["settings"]))
+
+    tried = set()
+    for name, settings in candidates:
+        key = _settings_key(settings)
+        if key in tried:
+            continue
+        tried.add(key)
+        found = _usable_tables(ctx, i, settings)
+        if found:
+            memo.remember(fingerprint, name, settings)
+            return found
+    return []
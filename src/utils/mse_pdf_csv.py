@@ -5,13 +5,16 @@ import os
 import re
 import sys
 from datetime import date, datetime, time
+from functools import partial
 from fileinput import filename
 from pathlib import Path
 from typing import List, Optional
 
 import numpy as np
 import pandas as pd
-import pdfplumber
+
+from mse_parallel import PDF_TIMEOUT, default_workers, run_pdf_jobs, write_failure_log
+from mse_pdf_context import PdfContext, first_tables, using_context
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -167,10 +170,13 @@ def _parse_time_str(s: str):
 
     return None
 
-def extract_print_date_time(pdf_path: str | Path, search_pages: int = 2, day_first: bool = True):
+def extract_print_date_time(pdf_path: str | Path | PdfContext, search_pages: int = 2, day_first: bool = True):
     """
     Extract ONLY the 'Print Date' and 'Print Time' from the PDF text.
 
+    Pass the ``PdfContext`` already used for table extraction to reuse its
+    parsed pages instead of opening the file again.
+
     Returns
     -------
     {
@@ -180,17 +186,11 @@ def extract_print_date_time(pdf_path: str | Path, search_pages: int = 2, day_fir
       'raw_time': str | None
     }
     """
-    pdf_path = Path(pdf_path)
     raw_date_snip = raw_time_snip = None
-    text = ""
 
-    with pdfplumber.open(pdf_path) as pdf:
-        n = min(max(search_pages, 1), len(pdf.pages))
+    with using_context(pdf_path) as ctx:
         # Concatenate small chunks (keeps label context)
-        page_texts = []
-        for i in range(n):
-            page_texts.append(pdf.pages[i].extract_text() or "")
-        text = "\n".join(page_texts)
+        text = ctx.head_text(search_pages)
 
     # Prefer labeled fields
     m = re.search(r'(?is)Print\s*Date\s*:?\s*([^\n\r]+)', text)
@@ -225,6 +225,52 @@ def to_numeric_clean(val):
     except ValueError:
         return np.nan
 
+def _float_or_nan(val: str):
+    try:
+        return float(val)
+    except ValueError:
+        return np.nan
+
+def _clean_text(values: np.ndarray):
+    """Cleaned text of an object array (as in ``to_numeric_clean``) and its missing-value mask."""
+    missing = pd.isna(values)
+    text = np.char.strip(np.where(missing, "", values).astype(str))
+    length = np.char.str_len(text)
+    missing |= length == 0
+    four = length == 4
+    if four.any():
+        missing[four] |= np.char.lower(text[four]) == "none"
+    # Handle parentheses as negatives
+    paren = np.char.startswith(text, "(") & np.char.endswith(text, ")")
+    if paren.any():
+        text[paren] = ["-" + t[1:-1] for t in text[paren]]
+    return np.char.replace(text, ",", ""), missing
+
+def to_numeric_clean_frame(df: pd.DataFrame, skip=()) -> pd.DataFrame:
+    """
+    ``to_numeric_clean`` on every column not in ``skip``, with identical results.
+
+    The text clean-up runs once over the whole table as NumPy string ops and
+    each column is converted by a single ``map(float)``; only a column holding
+    something that is not a number falls back to one cell at a time.
+    """
+    convert = [j for j, c in enumerate(df.columns) if c not in skip]
+    values = df.to_numpy(dtype=object)[:, convert]
+    if values.size == 0:  #no rows or nothing to convert: unchanged, like the per-column apply
+        return df.copy()
+    text, missing = _clean_text(values)
+    columns = {c: df[c] if c in skip else None for c in df.columns}
+    for k, j in enumerate(convert):
+        present = ~missing[:, k]
+        out = np.full(len(df), np.nan)
+        cells = text[present, k].tolist()
+        try:
+            out[present] = list(map(float, cells))
+        except ValueError:
+            out[present] = [_float_or_nan(t) for t in cells]
+        columns[df.columns[j]] = out
+    return pd.DataFrame(columns, index=df.index)
+
 def clean_cell(x):
     if x is None:
         return None
@@ -283,26 +329,11 @@ def extract_first_table(pdf_path: str | Path,
     -------
     pandas.DataFrame
     """
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
+    # Open the report once; the print date below reuses the parsed pages
+    with PdfContext(pdf_path) as ctx:
+        for i in range(ctx.n_pages):
             # Try a few strategies to find tables
-            strategies = [
-                dict(vertical_strategy="lines", horizontal_strategy="lines",
-                     snap_tolerance=3, join_tolerance=3, edge_min_length=3),
-                dict(vertical_strategy="lines_strict", horizontal_strategy="lines_strict"),
-                dict(vertical_strategy="text", horizontal_strategy="text"),
-            ]
-            tables = []
-            for ts in strategies:
-                try:
-                    t = page.extract_tables(table_settings=ts) or []
-                    for raw in t:
-                        if raw and len(raw) >= 2 and max(len(r) for r in raw) >= 2:
-                            tables.append(raw)
-                    if tables:
-                        break
-                except Exception:
-                    continue
+            tables = first_tables(ctx, i)
 
             if not tables:
                 continue
@@ -363,13 +394,11 @@ def extract_first_table(pdf_path: str | Path,
             # Convert counter_id to integer (removes decimals)
             df['counter_id'] = pd.to_numeric(df['counter_id'], errors='coerce').astype('Int64')
 
-            # Convert to numeric where possible
-            for c in df.columns:
-                if c != "counter":  # leave counter as string
-                    df[c] = df[c].apply(to_numeric_clean)
+            # Convert to numeric where possible (leave counter as string)
+            df = to_numeric_clean_frame(df, skip=["counter"])
 
             # Create filename using file print date
-            info = extract_print_date_time(pdf_path)
+            info = extract_print_date_time(ctx)
             print_date = info['date']
             print_time = info['time']
 
@@ -482,41 +511,40 @@ def get_most_recent_mse_report(directory_path):
         print(f"Error finding most recent MSE report: {e}")
         return None
 
-def process_multiple_pdfs(input_dir: Path, out_dir: Path, start_date: date, cols: List[str], logs_dir: Optional[str | Path] = None) -> List[Optional[Path]]:
-    not_processed = []
-    for pdf_path in input_dir.glob('*.pdf'):
-        try:
-            file_date = extract_date_from_filename(pdf_path)
-            if not file_date:
-                print(f"⚠️  Skipping (no date in filename): {pdf_path.name}")
-                continue
-            if file_date >= start_date:
-                print(f"Processing {pdf_path.name} dated {file_date}")
-                output_file = extract_first_table(
-                                    pdf_path=pdf_path,
-                                    out_dir=out_dir,
-                                    header=cols,
-                                    skip_header_rows=1,
-                                    auto_skip_header_like=True
-                                )
-                if output_file:
-                    print(f"✅ Successfully Processed {pdf_path.name} -> {output_file}")
-                else:
-                    print(f"❌ Failed to process {pdf_path.name}")
-                    not_processed.append(pdf_path.name)
-                    continue
-        except Exception as e:
-            print(f"❌ Error processing {pdf_path.name}: {e}")
-            output_file = None
-
+def process_multiple_pdfs(input_dir: Path, out_dir: Path, start_date: date, cols: List[str], logs_dir: Optional[str | Path] = None,
+                          workers: int = 1, timeout: Optional[float] = PDF_TIMEOUT) -> List[Optional[Path]]:
+    """
+    Extract every report dated on/after ``start_date``.
 
-    # Write to file unprocessed PDF filenames
-    if not_processed:
-        log_file = logs_dir / "unprocessed_daily_pdfs.txt"
-        with open(log_file, "w") as f:
-            for fname in not_processed:
-                f.write(f"{fname}\n")
+    With ``workers > 1`` the reports are spread over a process pool (``0`` = one
+    per CPU). Each report gets ``timeout`` seconds; results are reported in file
+    order and all failures go to ``unprocessed_daily_pdfs.txt`` with the reason.
+    """
+    pdf_paths = []
+    for pdf_path in sorted(input_dir.glob('*.pdf')):
+        file_date = extract_date_from_filename(pdf_path)
+        if not file_date:
+            print(f"⚠️  Skipping (no date in filename): {pdf_path.name}")
+            continue
+        if file_date >= start_date:
+            pdf_paths.append(pdf_path)
+
+    workers = workers or default_workers()
+    print(f"Processing {len(pdf_paths)} reports with {workers} worker(s)...")
+    extract = partial(extract_first_table, out_dir=out_dir, header=cols, skip_header_rows=1, auto_skip_header_like=True)
+    results = run_pdf_jobs(extract, pdf_paths, workers=workers, timeout=timeout)
+    for r in results:
+        if r.ok:
+            print(f"✅ Successfully Processed {r.path.name} -> {r.output} ({r.seconds}s)")
+        else:
+            print(f"❌ Failed to process {r.path.name}: {r.error}")
+
+    # Write to file unprocessed PDF filenames (with the reason)
+    logs_dir = Path(logs_dir or Path.cwd().parent.parent / "logs/unprocessed_daily_pdfs")
+    log_file = write_failure_log(results, logs_dir / "unprocessed_daily_pdfs.txt")
+    if log_file:
         print(f"Unprocessed PDF filenames written to {log_file}")
+    return [r.output if r.ok else None for r in results]
 
 def process_latest_report(input_dir: Path, out_dir: Path, cols: List[str]) -> List[Optional[Path]]:
 
@@ -586,7 +614,7 @@ def merge_csv_into_master(data_dir: Path, master_csv: Path, cols: List[str]):
     master_df.to_csv(master_csv, index=False)
     print(f"✅ Master CSV created at {master_csv} with {len(master_df)} unique records")
 
-def main(process_latest=True, start_date_str="2017-01-01"):
+def main(process_latest=True, start_date_str="2017-01-01", workers=1, timeout=PDF_TIMEOUT):
     """
     Main function to extract MSE data from PDF and save to CSV
     """
@@ -607,9 +635,16 @@ def main(process_latest=True, start_date_str="2017-01-01"):
         # Process all reports from a start date
         start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
         print(f"Processing all reports from {start_date} onwards...")
-        process_multiple_pdfs(DIR_REPORTS_PDF, DIR_REPORTS_CSV, start_date, cols, DIR_LOGS)
+        process_multiple_pdfs(DIR_REPORTS_PDF, DIR_REPORTS_CSV, start_date, cols, DIR_LOGS, workers, timeout)
 
 if __name__ == "__main__":
-    PROCESS_LATEST = False
-    main(process_latest=PROCESS_LATEST)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract MSE daily report tables from PDF to CSV")
+    parser.add_argument("--latest", action="store_true", help="process only the most recent report")
+    parser.add_argument("--start-date", default="2017-01-01", help="first report date to process (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for backfills (0 = one per CPU)")
+    parser.add_argument("--timeout", type=float, default=PDF_TIMEOUT, help="seconds allowed per report (POSIX only)")
+    args = parser.parse_args()
+    main(process_latest=args.latest, start_date_str=args.start_date, workers=args.workers, timeout=args.timeout)
 
@@ -5,15 +5,18 @@ import os
 import re
 import sys
 from datetime import date, datetime, time
+from functools import partial
 from fileinput import filename
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, NamedTuple, Optional
 
 import numpy as np
 import pandas as pd
-import pdfplumber
 import camelot
 
+from mse_parallel import PDF_TIMEOUT, default_workers, run_pdf_jobs, write_failure_log
+from mse_pdf_context import PdfContext, first_tables, using_context
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -171,10 +174,13 @@ def _parse_time_str(s: str):
 
     return None
 
-def extract_print_date_time(pdf_path: str | Path, search_pages: int = 2, day_first: bool = True):
+def extract_print_date_time(pdf_path: str | Path | PdfContext, search_pages: int = 2, day_first: bool = True):
     """
     Extract ONLY the 'Print Date' and 'Print Time' from the PDF text.
 
+    Pass the ``PdfContext`` already used for table extraction to reuse its
+    parsed pages instead of opening the file again.
+
     Returns
     -------
     {
@@ -184,17 +190,11 @@ def extract_print_date_time(pdf_path: str | Path, search_pages: int = 2, day_fir
       'raw_time': str | None
     }
     """
-    pdf_path = Path(pdf_path)
     raw_date_snip = raw_time_snip = None
-    text = ""
 
-    with pdfplumber.open(pdf_path) as pdf:
-        n = min(max(search_pages, 1), len(pdf.pages))
+    with using_context(pdf_path) as ctx:
         # Concatenate small chunks (keeps label context)
-        page_texts = []
-        for i in range(n):
-            page_texts.append(pdf.pages[i].extract_text() or "")
-        text = "\n".join(page_texts)
+        text = ctx.head_text(search_pages)
 
     # Prefer labeled fields
     m = re.search(r'(?is)Print\s*Date\s*:?\s*([^\n\r]+)', text)
@@ -267,19 +267,21 @@ def normalize_to_width(rows: list[list], width: int) -> list[list]:
     return out
 #updated
 def cleans(df, col):
-    for c in df.columns:
-        if c != col:  # leave counter as string
-            df[c] = df[c].apply(to_numeric_clean)
+    # leave counter as string
+    df = to_numeric_clean_frame(df, skip=[col])
 
     # keep only rows with at least one numeric
-    mask = df.apply(
-        lambda row: any(isinstance(val, (int, float, np.integer, np.floating)) and not pd.isna(val) 
-                        for val in row),
-        axis=1
-    )
-    df = df[mask]
+    df = df[numeric_row_mask(df)]
     return df
 
+_NUMBER_TYPES = (int, float, np.integer, np.floating)
+
+_is_number = np.frompyfunc(lambda v: isinstance(v, _NUMBER_TYPES) and not pd.isna(v), 1, 1)
+
+def numeric_row_mask(df) -> np.ndarray:
+    """True for rows holding at least one non-missing number (one pass over the table)."""
+    return _is_number(df.to_numpy(dtype=object)).astype(bool).any(axis=1)
+
     
 #Function updated
 def to_numeric_clean(val):
@@ -304,97 +306,157 @@ def to_numeric_clean(val):
         return float(val)
     except ValueError:
         return val
-#added function1 for standardized shapes for some pdf files
+
+def _float_or_text(val: str):
+    try:
+        return float(val)
+    except ValueError:
+        return val
+
+def _clean_text(values: np.ndarray):
+    """Cleaned text of an object array (as in ``to_numeric_clean``) and its missing-value mask."""
+    missing = pd.isna(values) | (values == "N/A")
+    text = np.char.strip(np.where(missing, "", values).astype(str))
+    length = np.char.str_len(text)
+    missing |= length == 0
+    four = length == 4
+    if four.any():
+        missing[four] |= np.char.lower(text[four]) == "none"
+    # Handle parentheses as negatives
+    paren = np.char.startswith(text, "(") & np.char.endswith(text, ")")
+    if paren.any():
+        text[paren] = ["-" + t[1:-1] for t in text[paren]]
+    return np.char.replace(np.char.replace(text, ",", ""), "*", ""), missing
+
+def to_numeric_clean_frame(df: pd.DataFrame, skip=()) -> pd.DataFrame:
+    """
+    ``to_numeric_clean`` on every column not in ``skip``, with identical results.
+
+    The text clean-up runs once over the whole table as NumPy string ops and
+    each column is converted by a single ``map(float)``; only a column holding
+    something that is not a number falls back to one cell at a time, keeping
+    the cleaned text of those cells.
+    """
+    convert = [j for j, c in enumerate(df.columns) if c not in skip]
+    values = df.to_numpy(dtype=object)[:, convert]
+    if values.size == 0:  #no rows or nothing to convert: unchanged, like the per-column apply
+        return df.copy()
+    text, missing = _clean_text(values)
+    columns = {c: df[c] if c in skip else None for c in df.columns}
+    for k, j in enumerate(convert):
+        present = ~missing[:, k]
+        out = np.full(len(df), np.nan)
+        cells = text[present, k].tolist()
+        try:
+            out[present] = list(map(float, cells))
+        except ValueError:
+            out = out.astype(object)
+            out[present] = [_float_or_text(t) for t in cells]
+            out = pd.Series(out, index=df.index).infer_objects()
+        columns[df.columns[j]] = out
+    return pd.DataFrame(columns, index=df.index)
+
+# ===============================================
+# SPLIT / REJOIN TOOLKIT
+# ===============================================
+# Older reports merge neighbouring cells ("1,234 1,250") or spread one number
+# over two cells. These helpers fix a whole column per call instead of one
+# Python call per cell or per row.
+
+def split_cells(s: pd.Series, n: int, sep: Optional[str] = ' ', fill=" ") -> pd.DataFrame:
+    """
+    Pieces ``0..n-1`` of ``str(x).split(sep)`` for every cell, as columns ``0..n-1``.
+
+    ``sep=None`` splits on runs of whitespace. Cells with fewer pieces get
+    ``fill``; with ``fill=None`` every piece is required and such a cell
+    raises ``ValueError`` (a layout mismatch, not an optional piece).
+    """
+    text = pd.Series(s.to_numpy(dtype=object).astype(str), index=s.index, dtype=object)
+    parts = text.str.split(sep, expand=True).reindex(columns=range(n))
+    if fill is not None:
+        return parts.fillna(fill)
+    missing = parts[n - 1].isna()
+    if missing.any():
+        raise ValueError(f"{s.name}: expected {n} merged values per cell, "
+                         f"{missing.sum()} cell(s) short, e.g. {text[missing].iloc[0]!r}")
+    return parts
+
+def rejoin_digits(high: pd.Series, low: pd.Series) -> pd.Series:
+    """
+    Numbers printed across two cells: ``high * 10**(len(str(low)) - 2) + low``.
+
+    ``low`` holds floats such as ``345.0``, hence the ``- 2`` for ``".0"``.
+    """
+    digits = np.maximum(low.map(str).str.len().to_numpy() - 2, 0)
+    return high.astype(float) * np.power(10.0, digits) + low.astype(float)
+
+# ===============================================
+# LAYOUT HANDLERS
+# ===============================================
+# Each report layout is turned into the 17 standard columns by the same
+# pipeline (see apply_layout); the functions below are its layout-specific
+# steps: `prepare` splits merged cells of the raw table, `finish` pads or
+# rejoins columns after cleaning and a date fixup repairs a single report.
+
 def shape14(df):
-    df['col_00']=df['col_0'].apply(lambda x:str(x).split(' ')[0])
-    df['col_01']=df['col_0'].apply(lambda x:str(x).split(' ')[1] if len(str(x).split(' '))>1 else " ")
-    df['col_02']=df['col_0'].apply(lambda x:str(x).split(' ')[2] if len(str(x).split(' '))>2 else " ")
-    df['col_55']=df['col_5'].apply(lambda x:str(x).split(' ')[0])
-    df['col_51']=df['col_5'].apply(lambda x:str(x).split(' ')[1] if len(str(x).split(' '))>1 else " ")
-    df['col_0']=df['col_00']
-    df['col_5']=df['col_55']
-    del df['col_00']
-    del df['col_55']
+    code = split_cells(df['col_0'], 3)
+    prices = split_cells(df['col_5'], 2)
+    df['col_0'], df['col_01'], df['col_02'] = code[0], code[1], code[2]
+    df['col_5'], df['col_51'] = prices[0], prices[1]
     df=df[['col_0','col_01', 'col_02', 'col_1', 'col_2', 'col_3', 'col_4', 'col_5','col_51', 'col_6', 'col_7',
            'col_8', 'col_9', 'col_10', 'col_11', 'col_12', 'col_13']]
     return df
-#added function2
-def shape16(df,trade_date):
-    if str(trade_date) in ['2018-08-10','2018-08-06','2018-07-02']:
-        df['col_00']=df['col_0'].apply(lambda x:str(x).split(' ')[0])
-        df['col_01']=df['col_0'].apply(lambda x:str(x).split(' ')[1] if len(str(x).split(' '))>1 else " ")
-        df['col_02']=df['col_0'].apply(lambda x:str(x).split(' ')[1] if len(str(x).split(' '))>1 else " ")
-        df['col_0']=df['col_00']
-        del df['col_00']
-        df=df[['col_0','col_01', 'col_02', 'col_1', 'col_2', 'col_3', 'col_4', 'col_5', 'col_6', 'col_7',
+
+def shape16(df):
+    """16 columns, buy/sell prices merged in col_7."""
+    prices = split_cells(df['col_7'], 2)
+    df['col_7'], df['col_71'] = prices[0], prices[1]
+    df=df[['col_0', 'col_1', 'col_2', 'col_3', 'col_4', 'col_5', 'col_6', 'col_7','col_71',
+           'col_8', 'col_9', 'col_10', 'col_11', 'col_12', 'col_13', 'col_14',
+           'col_15']]
+    return df
+
+def shape16_code(df):
+    """16 columns, counter code and daily range merged in col_0 (no col_8)."""
+    code = split_cells(df['col_0'], 2)
+    df['col_0'], df['col_01'], df['col_02'] = code[0], code[1], code[1]
+    df=df[['col_0','col_01', 'col_02', 'col_1', 'col_2', 'col_3', 'col_4', 'col_5', 'col_6', 'col_7',
            'col_9', 'col_10', 'col_11', 'col_12', 'col_13', 'col_14', 'col_15']]
-        col = 'col_1'
-        df = cleans(df, col)
-        df = df[df[col].notna()]
-        if str(trade_date) in ['2018-08-10','2018-08-06']:
-            df['col_7']=df['col_6']+df['col_7']
-            df['col_6']=df['col_5'].apply(lambda x:x.split()[1])
-            df['col_5']=df['col_5'].apply(lambda x:x.split()[0])
-    elif str(trade_date) in ['2018-06-26']:
-        df['col_00']=df['col_0'].apply(lambda x:str(x).split(' ')[0])
-        df['col_01']=df['col_0'].apply(lambda x:str(x).split(' ')[1] if len(str(x).split(' '))>1 else " ")
-        df['col_0']=df['col_00']
-        del df['col_00']
-        df=df[['col_0', 'col_01', 'col_1', 'col_2', 'col_3', 'col_4', 'col_5', 'col_6', 'col_7',
-               'col_8', 'col_9', 'col_10', 'col_11', 'col_12', 'col_13', 'col_14',
-               'col_15']]
-        col='col_2'
-        df = cleans(df, col)
-        df = df[df[col].notna()]
-    else:
-        df['col_77']=df['col_7'].apply(lambda x:str(x).split(' ')[0])
-        df['col_71']=df['col_7'].apply(lambda x:str(x).split(' ')[1] if len(str(x).split(' '))>1 else " ")
-       
-        df['col_7']=df['col_77']
-        del df['col_77']
-        df=df[['col_0', 'col_1', 'col_2', 'col_3', 'col_4', 'col_5', 'col_6', 'col_7','col_71',
+    return df
+
+def shape16_counter(df):
+    """16 columns, counter code and daily high merged in col_0."""
+    code = split_cells(df['col_0'], 2)
+    df['col_0'], df['col_01'] = code[0], code[1]
+    df=df[['col_0', 'col_01', 'col_1', 'col_2', 'col_3', 'col_4', 'col_5', 'col_6', 'col_7',
            'col_8', 'col_9', 'col_10', 'col_11', 'col_12', 'col_13', 'col_14',
-           'col_15']] 
-        col = 'col_3'
-        df = cleans(df, col)
-        df = df[df[col].notna()]
+           'col_15']]
     return df
-#added function3
+
 def shape19(df):
-    df['col_00']=df['col_0'].apply(lambda x:str(x).split(' ')[0])
-    df['col_01']=df['col_0'].apply(lambda x:str(x).split(' ')[1] if len(str(x).split(' '))>1 else " ")
-    df['col_02']=df['col_0'].apply(lambda x:str(x).split(' ')[1] if len(str(x).split(' '))>1 else " ")
-    
-    df['col_0']=df['col_00']
-    del df['col_00']
+    code = split_cells(df['col_0'], 2)
+    df['col_0'], df['col_01'], df['col_02'] = code[0], code[1], code[1]
     df=df[['col_0', 'col_01','col_02','col_1', 'col_2', 'col_3', 'col_4', 'col_5', 'col_6', 'col_7',
        'col_8', 'col_9', 'col_10', 'col_11', 'col_12', 'col_13', 'col_14',
        'col_15','col_16','col_17','col_18']]
-           
     return df
-#added function4
-def dp(row):
-    n=len(str(row['col_18']))-2
-    i=1
-    for j in range(n):
-        i*=10
-    return float(row['col_17'])*i+float(row['col_18'])
-#added fuction5
-def shape15(df,col):
-    df =df[:-1]
-    df=cleans(df, col)
-    df = df[df[col].notna()]
+
+def join_dp(df):
+    """Rejoin the share count split over col_17/col_18 (19-column layout)."""
+    df['col_17']=rejoin_digits(df['col_17'], df['col_18'])
+    del df['col_18']
+    return df
+
+def pad15(df):
+    """15 columns: no daily range, add empty high/low columns."""
     cl=df.columns
     df['col_01']=np.nan
     df['col_02']=np.nan
     df=df[[cl[0],'col_01','col_01',cl[1],cl[2],cl[3],cl[4],cl[5],cl[6],cl[7],cl[8],cl[9],cl[10],cl[11],cl[12],cl[13],cl[14]]]
     return df
-#added function6
-def genshape(df,col):
-    df =df[:-4]
-    df=cleans(df, col)
-    df = df[df[col].notna()]
-    df = df.dropna(axis=1, how="all")
+
+def pad_summary(df):
+    """Summary-first reports (late 2017 / early 2018): add the columns they do not print."""
     df['col_0']=np.nan
     df['col_1']=np.nan
     df['col_10']=np.nan
@@ -403,71 +465,173 @@ def genshape(df,col):
     df=df[['col_0','col_1',cl[0],cl[1],cl[2],cl[3],'col_10','col_11',cl[4],cl[5],cl[6],cl[7],cl[8],cl[9],cl[10],cl[11]]]
     df=df.reset_index()
     return df
-#added function7
-def stream_f(pdf_path,col,date):
-    tables = camelot.read_pdf(pdf_path, pages='1', flavor='stream') 
-    first_table = tables[0].df
-    df_first = pd.DataFrame(first_table)
-    df = df_first.reset_index(drop=True)
+
+def drop_last(df):
+    return df[:-1]
+
+def read_stream_table(pdf_path):
+    """First table of page 1 read by camelot's stream flavour (July 2018 reports)."""
+    tables = camelot.read_pdf(str(pdf_path), pages='1', flavor='stream')
+    df = pd.DataFrame(tables[0].df).reset_index(drop=True)
     df.columns=[f"col_{n}" for n in df.columns]
-    if str(date) in ['2018-07-20','2018-07-10']:
-        df = cleans(df, col)
-        df = df[df[col].notna()]
-        del df['col_9']
-        df['col_8'].fillna(value=0, inplace=True)
-    elif str(date) =='2018-07-26':
-        df = cleans(df, col)
-        df = df[df[col].notna()]
-        df['col_2']=df['col_1']
-        df.iat[-2,3]='TNM'
+    return df
+
+def _next_col(col):
+    return f"col_{int(col.split('_')[1]) + 1}"
+
+def split_merged(df, col, merge=False, shift=0):
+    """
+    Split a cell printed as "a b" in ``col`` into ``col`` and the next column.
+
+    The next column's old value is either prepended to the one after it
+    (``merge``) or moved right together with the ``shift - 1`` columns that follow.
+    Both values are required: a cell holding fewer raises ``ValueError``.
+    """
+    nxt = _next_col(col)
+    if merge:
+        after = _next_col(nxt)
+        df[after]=df[nxt]+df[after]
     else:
-        df = cleans(df, col)
-        df = df[df[col].notna()]
-    df=df[:-1]
+        moved = [nxt]
+        for _ in range(shift - 1):
+            moved.append(_next_col(moved[-1]))
+        for c in reversed(moved):
+            df[_next_col(c)]=df[c]
+    parts = split_cells(df[col], 2, sep=None, fill=None)
+    df[col], df[nxt] = parts[0], parts[1]
+    return df
+
+def rejoin_close(df):
+    """June 2018: the last digits of the closing price were printed in col_6."""
+    words = split_cells(df['col_6'], 2, sep=None, fill="")
+    single = words[1].eq("")
+    df['col_7']=df['col_7'].where(single, words[1] + df['col_7'].map(str))
+    df['col_6']=words[0].astype(float)
+    return df
+
+def drop_col9(df):
+    del df['col_9']
+    df['col_8'].fillna(value=0, inplace=True)
     return df
-#added function for general for shapes
-def processshape15(df,col,print_date):
-    df=shape15(df,col)
-    if str(print_date)=='2018-08-13':
-        df['col_10']=df['col_9']
-        df['col_9']=df['col_8']
-        df['col_8']=df['col_7']
-        df['col_7']=df['col_6']
-        df['col_6']=df['col_5'].apply(lambda x:x.split()[1])
-        df['col_5']=df['col_5'].apply(lambda x:x.split()[0])
-    if str(print_date) in ['2018-06-25','2018-06-22','2018-06-21','2018-06-20','2018-06-19','2018-06-18']:
-        def mapper(row):
-            if len(str(row['col_6']).split())==1:
-                return row['col_7'] 
-            else:
-                return str(row['col_6']).split()[1]+str(row['col_7'])
-        df['col_7']=df.apply(mapper,axis=1)
-        df['col_6']=df['col_6'].apply(lambda x:float(str(x).split()[0]))
+
+def fix_tnm(df):
+    df['col_2']=df['col_1']
+    df.iat[-1,3]='TNM'
     return df
+
+# ===============================================
+# LAYOUT REGISTRY
+# ===============================================
+class Layout(NamedTuple):
+    """
+    Declarative recipe for one report layout (see ``apply_layout``).
+
+    source       reads the raw table itself instead of using pdfplumber's (pdf_path -> df)
+    prepare      splits merged cells of the raw table before cleaning (df -> df)
+    trim         trailing summary rows dropped before cleaning
+    key_col      text column that must be non-empty on a counter row
+    reset_index  keep the pre-cleaning row number as an ``index`` column
+    drop_empty   drop all-empty columns after cleaning
+    finish       pads or rejoins columns after cleaning (df -> df)
+    """
+    key_col: str = 'col_3'
+    trim: int = 0
+    source: Optional[Callable] = None
+    prepare: Optional[Callable] = None
+    reset_index: bool = False
+    drop_empty: bool = False
+    finish: Optional[Callable] = None
+
+LAYOUTS = {
+    'default': Layout(),
+    'trimmed': Layout(trim=1, drop_empty=True),
+    'summary_first': Layout(key_col='col_2', trim=4, drop_empty=True, finish=pad_summary),
+    'stream': Layout(source=read_stream_table, finish=drop_last),
+    'shape14': Layout(key_col='col_1', prepare=shape14),
+    'shape15': Layout(key_col='col_1', trim=1, finish=pad15),
+    'shape16': Layout(prepare=shape16),
+    'shape16_code': Layout(key_col='col_1', prepare=shape16_code),
+    'shape16_counter': Layout(key_col='col_2', prepare=shape16_counter),
+    'shape18': Layout(drop_empty=True),
+    'shape19': Layout(key_col='col_1', prepare=shape19, drop_empty=True, finish=join_dp),
+    'wide': Layout(key_col='col_2', trim=4, reset_index=True, drop_empty=True),
+    'wide33': Layout(key_col='col_4', trim=2, reset_index=True, drop_empty=True),
+}
+
+# Reports whose layout is known by date: (first, last, layout), both inclusive
+LAYOUT_DATES = [
+    ('2017-09-14', '2017-09-14', 'summary_first'),
+    ('2017-11-20', '2017-11-20', 'summary_first'),
+    ('2017-12-27', '2017-12-27', 'summary_first'),
+    ('2018-01-08', '2018-01-09', 'summary_first'),
+    ('2018-02-16', '2018-02-16', 'summary_first'),
+    ('2018-05-17', '2018-05-17', 'summary_first'),
+    ('2018-06-11', '2018-06-11', 'summary_first'),
+    ('2018-06-14', '2018-06-14', 'trimmed'),
+    ('2018-06-26', '2018-06-26', 'shape16_counter'),
+    ('2018-06-27', '2018-06-27', 'stream'),
+    ('2018-07-02', '2018-07-02', 'shape16_code'),
+    ('2018-07-03', '2018-07-27', 'stream'),
+    ('2018-08-06', '2018-08-06', 'shape16_code'),
+    ('2018-08-10', '2018-08-10', 'shape16_code'),
+]
+
+# Everything else is recognised by the column count of the extracted table
+LAYOUT_SHAPES = {14: 'shape14', 15: 'shape15', 16: 'shape16', 18: 'shape18', 19: 'shape19',
+                 28: 'wide', 30: 'wide', 31: 'wide', 33: 'wide33'}
+
+# One-off repairs applied after the layout, by report date
+DATE_FIXUPS = {
+    '2018-06-18': rejoin_close, '2018-06-19': rejoin_close, '2018-06-20': rejoin_close,
+    '2018-06-21': rejoin_close, '2018-06-22': rejoin_close, '2018-06-25': rejoin_close,
+    '2018-07-10': drop_col9, '2018-07-20': drop_col9,
+    '2018-07-26': fix_tnm,
+    '2018-08-06': partial(split_merged, col='col_5', merge=True),
+    '2018-08-07': partial(split_merged, col='col_7', merge=True),
+    '2018-08-08': partial(split_merged, col='col_7', shift=1),
+    '2018-08-10': partial(split_merged, col='col_5', merge=True),
+    '2018-08-13': partial(split_merged, col='col_5', shift=4),
+}
+
+def _index_dates(entries) -> dict:
+    index = {}
+    for first, last, name in entries:
+        for day in pd.date_range(first, last):
+            index[str(day.date())] = name
+    return index
+
+_LAYOUT_BY_DATE = _index_dates(LAYOUT_DATES)
+
+def resolve_layout(print_date, n_cols: int) -> str:
+    """Layout name for a report: by date when listed, else by column count, else 'default'."""
+    return _LAYOUT_BY_DATE.get(str(print_date)) or LAYOUT_SHAPES.get(n_cols, 'default')
+
+def apply_layout(df, layout: Layout, print_date, pdf_path) -> pd.DataFrame:
+    """Run the extraction pipeline for one layout and apply the report's date fixup, if any."""
+    if layout.source:
+        df = layout.source(pdf_path)
+    if layout.prepare:
+        df = layout.prepare(df)
+    if layout.trim:
+        df = df[:-layout.trim]
+    df = cleans(df, layout.key_col)
+    if layout.reset_index:
+        df = df.reset_index()
+    df = df[df[layout.key_col].notna()]
+    if layout.drop_empty:
+        df = df.dropna(axis=1, how="all")
+    if layout.finish:
+        df = layout.finish(df)
+    fixup = DATE_FIXUPS.get(str(print_date))
+    return fixup(df) if fixup else df
+
 #Function updated
 def extract_first_table(pdf_path: str | Path,out_dir: Optional[str | Path] = None,) -> pd.DataFrame:
-    date1=['2017-11-20','2017-12-27','2017-09-14','2018-01-08','2018-01-09','2018-06-11','2018-02-16','2018-05-17']
-    date2=['2018-07-03','2018-07-04','2018-07-05','2018-07-09','2018-07-10','2018-07-12','2018-07-13','2018-07-16','2018-07-17','2018-07-18','2018-07-19','2018-07-20','2018-07-23','2018-07-25','2018-07-26','2018-07-27','2018-06-27']
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
+    # Open the report once; the print date below reuses the parsed pages
+    with PdfContext(pdf_path) as ctx:
+        for i in range(ctx.n_pages):
             # Try a few strategies to find tables
-            strategies = [
-                dict(vertical_strategy="lines", horizontal_strategy="lines",
-                     snap_tolerance=3, join_tolerance=3, edge_min_length=3),
-                dict(vertical_strategy="lines_strict", horizontal_strategy="lines_strict"),
-                dict(vertical_strategy="text", horizontal_strategy="text"),
-            ]
-            tables = []
-            for ts in strategies:
-                try:
-                    t = page.extract_tables(table_settings=ts) or []
-                    for raw in t:
-                        if raw and len(raw) >= 2 and max(len(r) for r in raw) >= 2:
-                            tables.append(raw)
-                    if tables:
-                        break
-                except Exception:
-                    continue
+            tables = first_tables(ctx, i)
 
             if not tables:
                 continue
@@ -479,77 +643,12 @@ def extract_first_table(pdf_path: str | Path,out_dir: Optional[str | Path] = Non
             df = pd.DataFrame(rows).dropna(how="all")
             df.columns=[f"col_{n}" for n in df.columns]
            
-            info = extract_print_date_time(pdf_path)
+            info = extract_print_date_time(ctx)
             print_date = info['date']
             print_time = info['time']
-            print(df.shape)
-            col = 'col_3'
-            if str(print_date) =='2018-06-14': 
-                df =df[:-1]
-                df=cleans(df, col)
-                df = df[df[col].notna()]
-                df = df.dropna(axis=1, how="all")
-            elif str(print_date) in date1:
-                col='col_2'
-                df=genshape(df,col)
-            elif str(print_date) in date2:
-                df=stream_f(pdf_path,col,print_date)
-            elif df.shape[1] == 14:
-                df=shape14(df)
-                col = 'col_1'
-                df = cleans(df, col)
-                df = df[df[col].notna()]
-            elif df.shape[1]==15:
-                col='col_1'
-                df=processshape15(df,col,print_date)
-            elif df.shape[1] == 16:
-                df=shape16(df,print_date)
-            elif df.shape[1] == 18:
-                col = 'col_3'
-                df = cleans(df, col)
-                df = df[df[col].notna()]
-                df = df.dropna(axis=1, how="all")
-                if str(print_date)=='2018-08-07':
-                    df['col_9']=df['col_8']+df['col_9']
-                    df['col_8']=df['col_7'].apply(lambda x:x.split()[1])
-                    df['col_7']=df['col_7'].apply(lambda x:x.split()[0])
-            elif df.shape[1] == 19:
-                df=shape19(df)
-                col = 'col_1'
-                df = cleans(df, col)
-                df = df[df[col].notna()]
-                df = df.dropna(axis=1, how="all")
-                df['col_17']=df.apply(dp,axis=1)
-                del df['col_18']
-            elif df.shape[1] == 28:
-                col = 'col_2'
-                df = df[:-4]
-                df = cleans(df, col)
-                df = df.reset_index()
-                df = df[df[col].notna()]
-                df = df.dropna(axis=1, how="all")
-            elif df.shape[1] == 33:
-                col = 'col_4'
-                df = df[:-2]
-                df = cleans(df, col)
-                df = df.reset_index()
-                df = df[df[col].notna()]
-                df = df.dropna(axis=1, how="all")
-            elif df.shape[1] == 30 or df.shape[1] == 31:
-                col = 'col_2'
-                df = df[:-4]
-                print(df.shape)
-                df = cleans(df, col)
-                df = df.reset_index()
-                df = df[df[col].notna()]
-                df = df.dropna(axis=1, how="all")
-            else:
-                df = cleans(df, col)
-                df = df[df[col].notna()]
-                if str(print_date)=='2018-08-08':
-                    df['col_9']=df['col_8']
-                    df['col_8']=df['col_7'].apply(lambda x:x.split()[1])
-                    df['col_7']=df['col_7'].apply(lambda x:x.split()[0])
+            layout = resolve_layout(print_date, df.shape[1])
+            print(df.shape, layout)
+            df = apply_layout(df, LAYOUTS[layout], print_date, pdf_path)
 
             df.columns=cols
             df['trade_date'] = print_date
@@ -648,37 +747,40 @@ def get_most_recent_mse_report(directory_path):
         print(f"Error finding most recent MSE report: {e}")
         return None
 
-def process_multiple_pdfs(input_dir: Path, out_dir: Path, start_date: date, cols: List[str], logs_dir: Optional[str | Path] = None) -> List[Optional[Path]]:
-    not_processed = []
-    for pdf_path in input_dir.glob('*.pdf'):
-        try:
-            file_date = extract_date_from_filename(pdf_path)
-            if not file_date:
-                print(f"⚠️  Skipping (no date in filename): {pdf_path.name}")
-                continue
-            if file_date >= start_date:
-                print(f"Processing {pdf_path.name} dated {file_date}")
-                output_file = extract_first_table(pdf_path=pdf_path,out_dir=out_dir)
-                if output_file:
-                    print(f"✅ Successfully Processed {pdf_path.name} -> {output_file}")
-                else:
-                    print(f"❌ Failed to process {pdf_path.name}")
-                    not_processed.append(pdf_path.name)
-                    continue
-        except Exception as e:
-            print(f"❌ Error processing {pdf_path.name}: {e}")
-            output_file = None
-            not_processed.append(pdf_path.name)
-
-
-    # Write to file unprocessed PDF filenames
-    if not_processed:
-        DIR_LOGS = Path.cwd().parent.parent / "logs/unprocessed_daily_pdfs"
-        log_file = DIR_LOGS / "unprocessed_daily_pdfs.txt"
-        with open(log_file, "w") as f:
-            for fname in not_processed:
-                f.write(f"{fname}\n")
+def process_multiple_pdfs(input_dir: Path, out_dir: Path, start_date: date, cols: List[str], logs_dir: Optional[str | Path] = None,
+                          workers: int = 1, timeout: Optional[float] = PDF_TIMEOUT) -> List[Optional[Path]]:
+    """
+    Extract every report dated on/after ``start_date``.
+
+    With ``workers > 1`` the reports are spread over a process pool (``0`` = one
+    per CPU). Each report gets ``timeout`` seconds; results are reported in file
+    order and all failures go to ``unprocessed_daily_pdfs.txt`` with the reason.
+    """
+    pdf_paths = []
+    for pdf_path in sorted(input_dir.glob('*.pdf')):
+        file_date = extract_date_from_filename(pdf_path)
+        if not file_date:
+            print(f"⚠️  Skipping (no date in filename): {pdf_path.name}")
+            continue
+        if file_date >= start_date:
+            pdf_paths.append(pdf_path)
+
+    workers = workers or default_workers()
+    print(f"Processing {len(pdf_paths)} reports with {workers} worker(s)...")
+    extract = partial(extract_first_table, out_dir=out_dir)
+    results = run_pdf_jobs(extract, pdf_paths, workers=workers, timeout=timeout)
+    for r in results:
+        if r.ok:
+            print(f"✅ Successfully Processed {r.path.name} -> {r.output} ({r.seconds}s)")
+        else:
+            print(f"❌ Failed to process {r.path.name}: {r.error}")
+
+    # Write to file unprocessed PDF filenames (with the reason)
+    logs_dir = Path(logs_dir or Path.cwd().parent.parent / "logs/unprocessed_daily_pdfs")
+    log_file = write_failure_log(results, logs_dir / "unprocessed_daily_pdfs.txt")
+    if log_file:
         print(f"Unprocessed PDF filenames written to {log_file}")
+    return [r.output if r.ok else None for r in results]
 
 def process_latest_report(input_dir: Path, out_dir: Path, cols: List[str]) -> List[Optional[Path]]:
 
@@ -746,7 +848,7 @@ def merge_csv_into_master(data_dir: Path, master_csv: Path):
     print(f"✅ Master CSV created at {master_csv} with {len(master_df)} unique records")
 
 #function updated
-def main(process_latest=True, start_date_str="2017-01-01"):
+def main(process_latest=True, start_date_str="2017-01-01", workers=1, timeout=PDF_TIMEOUT):
     """
     Main function to extract MSE data from PDF and save to CSV
     """
@@ -768,10 +870,17 @@ def main(process_latest=True, start_date_str="2017-01-01"):
         # Process all reports from a start date
         start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
         print(f"Processing all reports from {start_date} onwards...")
-        process_multiple_pdfs(DIR_REPORTS_PDF, DIR_REPORTS_CSV, start_date, cols, DIR_LOGS)
+        process_multiple_pdfs(DIR_REPORTS_PDF, DIR_REPORTS_CSV, start_date, cols, DIR_LOGS, workers, timeout)
         merge_csv_into_master(DIR_REPORTS_CSV, master_csv)
         
 
 if __name__ == "__main__":
-    PROCESS_LATEST = False
-    main(process_latest=PROCESS_LATEST)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract MSE daily report tables from PDF to CSV")
+    parser.add_argument("--latest", action="store_true", help="process only the most recent report")
+    parser.add_argument("--start-date", default="2017-01-01", help="first report date to process (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for backfills (0 = one per CPU)")
+    parser.add_argument("--timeout", type=float, default=PDF_TIMEOUT, help="seconds allowed per report (POSIX only)")
+    args = parser.parse_args()
+    main(process_latest=args.latest, start_date_str=args.start_date, workers=args.workers, timeout=args.timeout)
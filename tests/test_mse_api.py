@@ -0,0 +1,54 @@
+# test_mse_api.py
+
+"""
+Request validation for the price endpoints and the SQL they build.
+
+These cases are rejected by FastAPI before any handler code runs, so they
+need no database: the response cache (whose middleware reads the data
+version) is switched off for the duration of each test.
+"""
+
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+import mse_api
+from mse_queries import PRICE_COLUMNS, build_batch_prices_query, encode_cursor
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(mse_api.response_cache, "max_entries", 0)
+    return TestClient(mse_api.app)
+
+
+@pytest.mark.parametrize("limit", [0, -1, -3])
+def test_daily_prices_rejects_non_positive_limit(client, limit):
+    response = client.get("/prices/daily", params={"ticker": "AIRTEL", "limit": limit})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("limit", [0, -1, -3])
+def test_daily_prices_page_rejects_non_positive_limit(client, limit):
+    cursor = encode_cursor(date(2024, 1, 2), "1")
+    response = client.get("/prices/daily", params={"ticker": "AIRTEL", "limit": limit, "cursor": cursor})
+    assert response.status_code == 422
+
+
+def test_daily_prices_rejects_limit_above_max(client):
+    response = client.get("/prices/daily", params={"ticker": "AIRTEL", "limit": 1001})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_multi_ticker_rejects_non_positive_limit(client, limit):
+    response = client.get("/prices/daily", params={"ticker": "AIRTEL,NBM", "limit": limit})
+    assert response.status_code == 422
+
+
+def test_batch_query_selects_price_columns_only():
+    sql, params = build_batch_prices_query([("1", None, None, 5), ("2", date(2024, 1, 1), None, 10)])
+    assert "p.*" not in sql
+    assert ", ".join("p." + c for c in PRICE_COLUMNS) in sql
+    assert params["limits"] == [5, 10]
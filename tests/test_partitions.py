@@ -0,0 +1,67 @@
+# test_partitions.py
+
+"""
+Partition pruning of the date-bounded price queries (``EXPLAIN`` plans).
+
+Needs a scratch PostgreSQL database, given as a SQLAlchemy URL in
+``MSE_TEST_DATABASE_URL``; skipped otherwise. The migrations run in a
+temporary schema that is dropped afterwards.
+"""
+
+import os
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from mse_migrations import check_pruning, ensure_partitions, migrate, partitions_scanned
+from mse_queries import build_daily_prices_query, build_period_prices_query, build_period_summary_query
+
+TEST_DATABASE_URL = os.getenv("MSE_TEST_DATABASE_URL", "").strip()
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="MSE_TEST_DATABASE_URL is not set")
+
+COUNTER_ID = "MWTEST000001"
+
+
+@pytest.fixture(scope="module")
+def engine():
+    schema = f"mse_test_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(TEST_DATABASE_URL)
+    with admin.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        migrate(engine)
+        with engine.begin() as conn:
+            ensure_partitions(conn, date(2022, 1, 1), date(2024, 12, 31))
+            conn.execute(text(
+                "INSERT INTO daily_prices (counter_id, trade_date, close_mwk) "
+                "SELECT :counter_id, d, 1 FROM generate_series(DATE '2022-01-03', DATE '2024-12-31', '1 day') d"),
+                {"counter_id": COUNTER_ID})
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        admin.dispose()
+
+
+@pytest.mark.parametrize("query, expected", [
+    (build_period_prices_query(COUNTER_ID, 2023), ["daily_prices_2023"]),
+    (build_period_prices_query(COUNTER_ID, 2023, 12), ["daily_prices_2023"]),
+    (build_period_summary_query(COUNTER_ID, 2022), ["daily_prices_2022"]),
+    (build_daily_prices_query(COUNTER_ID, date(2024, 3, 1), date(2024, 3, 31), 100), ["daily_prices_2024"]),
+    (build_daily_prices_query(COUNTER_ID, date(2022, 7, 1), date(2023, 6, 30), 100),
+     ["daily_prices_2022", "daily_prices_2023"]),
+])
+def test_query_scans_only_its_partitions(engine, query, expected):
+    sql, params = query
+    with engine.connect() as conn:
+        assert partitions_scanned(conn, sql, params) == expected
+
+
+def test_check_pruning(engine):
+    results = check_pruning(engine)
+    assert results and all(r["ok"] for r in results), results
@@ -0,0 +1,56 @@
+# test_pdf_clean.py
+
+"""
+``to_numeric_clean_frame`` matches the per-column ``apply(to_numeric_clean)``
+it replaced, including on empty tables.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import mse_pdf_csv
+
+
+def extractors():
+    modules = [mse_pdf_csv]
+    try:
+        import mse_pdf_csv_Ex  # needs camelot
+        modules.append(mse_pdf_csv_Ex)
+    except ImportError:
+        pass
+    return modules
+
+
+def per_column(module, df, skip):
+    out = df.copy()
+    for c in out.columns:
+        if c not in skip:
+            out[c] = out[c].apply(module.to_numeric_clean)
+    return out
+
+
+@pytest.fixture(params=extractors(), ids=lambda m: m.__name__)
+def module(request):
+    return request.param
+
+
+@pytest.mark.parametrize("df", [
+    pd.DataFrame({"counter": [], "volume": []}, dtype=object),
+    pd.DataFrame({"counter": ["NBM", "TNM"]}),
+    pd.DataFrame(),
+], ids=["no rows", "only skipped columns", "no columns"])
+def test_empty_frames_are_returned_unchanged(module, df):
+    result = module.to_numeric_clean_frame(df, skip=["counter"])
+    pd.testing.assert_frame_equal(result, df)
+    pd.testing.assert_frame_equal(result, per_column(module, df, ["counter"]))
+
+
+def test_matches_per_column_apply(module):
+    df = pd.DataFrame({
+        "counter": ["NBM", "TNM", "ICON", "NICO"],
+        "price": ["1,234.50", "(12.5)", None, " 7 "],
+        "volume": ["none", "", np.nan, "20000"],
+    }, dtype=object)
+    pd.testing.assert_frame_equal(module.to_numeric_clean_frame(df, skip=["counter"]),
+                                  per_column(module, df, ["counter"]))